@@ -1,156 +1,300 @@
 #!/usr/bin/env python3
+import hashlib
 import json
 import os
+import shelve
+import warnings
 import numpy as np
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional
 
-def analyze_complete_dataset():
-    """Analyze all ticker files and generate summary statistics"""
+from prediction_io import dump_json
 
-    data_dir = "/workspaces/sjc-gpu-kronos/results/complete_ohlcv_tickers"
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-    # Metrics to collect
-    all_scores = []
-    quality_counts = defaultdict(int)
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+DATA_DIR = "/workspaces/sjc-gpu-kronos/results/complete_ohlcv_tickers"
+CACHE_PATH = "/workspaces/sjc-gpu-kronos/results/analyze_dataset_cache"
+
+# Cached metrics are only valid for the parsing code that produced them, so
+# the cache is keyed on a hash of this file and starts over when it changes
+with open(__file__, 'rb') as _f:
+    CACHE_VERSION = hashlib.blake2b(_f.read(), digest_size=8).hexdigest()
+CACHE_VERSION_KEY = '__cache_version__'
+
+
+def _load(path):
+    """Load a JSON file, using orjson when it is installed"""
+    # Unbuffered: readall() sizes one buffer from fstat and fills it with a
+    # single read, skipping BufferedReader's extra copy
+    with open(path, 'rb', buffering=0) as f:
+        raw = f.readall()
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+# The only sections parse_ticker reads; the candlestick arrays are skipped
+SUMMARY_PREFIXES = ('summary_stats', 'data.prediction_metrics', 'data.model_info', 'data.metadata')
+
+# Files at least this large are streamed with ijson rather than decoded whole;
+# below it a full orjson/json decode is faster than ijson's per-token events
+STREAM_MIN_BYTES = 8 * 1024 * 1024
+
+
+def _load_summary(path):
+    """Load only the SUMMARY_PREFIXES sections of a ticker file
+
+    Files of at least STREAM_MIN_BYTES are stream-parsed with ijson when it
+    is installed, so the large candlestick arrays are never materialized;
+    parsing stops once every section is found. Otherwise the whole document
+    is loaded.
+    """
+    if ijson is None or os.path.getsize(path) < STREAM_MIN_BYTES:
+        return _load(path)
+
+    found = {}
+    with open(path, 'rb') as f:
+        builder = current = None
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                if prefix == current and event in ('end_map', 'end_array'):
+                    found[current] = builder.value
+                    builder = None
+            elif prefix in SUMMARY_PREFIXES and event != 'map_key':
+                if event in ('start_map', 'start_array'):
+                    current = prefix
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                else:
+                    found[prefix] = value
+
+            if builder is None and len(found) == len(SUMMARY_PREFIXES):
+                break
+
+    doc = {}
+    for prefix, section in found.items():
+        parent, _, key = prefix.rpartition('.')
+        (doc.setdefault(parent, {}) if parent else doc)[key] = section
+    return doc
+
+
+class TickerMetrics(NamedTuple):
+    """Flat per-file metrics extracted by parse_ticker"""
+    score: Optional[float]
+    quality: str
+    model_type: str
+    open_mape: Optional[float]
+    open_acc5: Optional[float]
+    open_acc10: Optional[float]
+    high_mape: Optional[float]
+    high_acc5: Optional[float]
+    high_acc10: Optional[float]
+    low_mape: Optional[float]
+    low_acc5: Optional[float]
+    low_acc10: Optional[float]
+    close_mape: Optional[float]
+    close_acc5: Optional[float]
+    close_acc10: Optional[float]
+    mc_sims: float
+    pred_days: float
+    lookback: float
+
+
+# Numeric TickerMetrics fields, in column order of the aggregation array
+METRIC_FIELDS = tuple(f for f in TickerMetrics._fields if f not in ('quality', 'model_type'))
+COLUMN = {name: i for i, name in enumerate(METRIC_FIELDS)}
+
+# prediction_metrics sections, in TickerMetrics field order
+METRIC_SPECS = ('open_metrics', 'high_metrics', 'low_metrics', 'close_metrics')
+
+
+def parse_ticker(path):
+    """Parse a single ticker file; returns TickerMetrics or None on error"""
+    try:
+        data = _load_summary(path)
+
+        # Summary stats
+        summary_stats = data.get('summary_stats', {})
+        score = summary_stats.get('overall_score')
+        quality = summary_stats.get('prediction_quality', 'unknown')
+
+        # OHLCV metrics
+        pred_metrics = data.get('data', {}).get('prediction_metrics', {})
 
-    # OHLCV accuracy metrics
-    open_mapes = []
-    high_mapes = []
-    low_mapes = []
-    close_mapes = []
+        # MAPE and accuracy values per price series (None when missing)
+        price_values = []
+        for key in METRIC_SPECS:
+            m = pred_metrics.get(key)
+            if m:
+                price_values += (m.get('mape'), m.get('accuracy_5pct'), m.get('accuracy_10pct'))
+            else:
+                price_values += (None, None, None)
 
-    open_accuracy_5pct = []
-    high_accuracy_5pct = []
-    low_accuracy_5pct = []
-    close_accuracy_5pct = []
+        # Model characteristics
+        model_info = data.get('data', {}).get('model_info', {})
 
-    open_accuracy_10pct = []
-    high_accuracy_10pct = []
-    low_accuracy_10pct = []
-    close_accuracy_10pct = []
+        # Metadata
+        metadata = data.get('data', {}).get('metadata', {})
 
-    # Model characteristics
+        return TickerMetrics(
+            score, quality, model_info.get('model_type', 'unknown'),
+            *price_values,
+            model_info.get('monte_carlo_simulations', 0),
+            metadata.get('prediction_days', 0),
+            metadata.get('lookback_days', 0)
+        )
+
+    except Exception as e:
+        print(f"Error processing {os.path.basename(path)}: {e}")
+        return None
+
+
+def _open_cache(cache_path):
+    """Open the metrics shelf, emptying it if CACHE_VERSION changed"""
+    cache = shelve.open(cache_path)
+    if cache.get(CACHE_VERSION_KEY) != CACHE_VERSION:
+        cache.close()
+        cache = shelve.open(cache_path, flag='n')
+        cache[CACHE_VERSION_KEY] = CACHE_VERSION
+    return cache
+
+
+def _parse_all(entries, cache_path):
+    """Return TickerMetrics (or None) per entry, re-parsing only changed files
+
+    Metrics are cached per path together with the file's st_mtime_ns and
+    st_size; a file whose stat still matches is served from the cache.
+    Pass cache_path=None to parse everything.
+    """
+    results = [None] * len(entries)
+    cache = _open_cache(cache_path) if cache_path else {}
+
+    try:
+        stale = []
+        for i, entry in enumerate(entries):
+            st = entry.stat()
+            cached = cache.get(entry.path)
+            if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+                results[i] = TickerMetrics(*cached[2])
+            else:
+                stale.append((i, entry.path, st))
+
+        if stale:
+            # Each file parses independently, so fan out across cores and reduce here
+            workers = os.cpu_count() or 1
+            chunksize = max(1, len(stale) // (4 * workers))
+            paths = [path for _, path, _ in stale]
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                parsed = executor.map(parse_ticker, paths, chunksize=chunksize)
+                for (i, path, st), m in zip(stale, parsed):
+                    results[i] = m
+                    if m is not None:
+                        cache[path] = (st.st_mtime_ns, st.st_size, tuple(m))
+
+        # Forget files that no longer exist
+        for path in set(cache) - {entry.path for entry in entries} - {CACHE_VERSION_KEY}:
+            del cache[path]
+    finally:
+        if cache_path:
+            cache.close()
+
+    print(f"Parsed {len(stale)} changed files, {len(entries) - len(stale)} from cache")
+    return results
+
+
+def analyze_complete_dataset(data_dir=DATA_DIR, cache_path=CACHE_PATH):
+    """Analyze all ticker files and generate summary statistics"""
+
+    quality_counts = defaultdict(int)
     model_types = defaultdict(int)
-    prediction_days = []
-    lookback_days = []
-    mc_simulations = []
 
-    print(f"Analyzing {len(os.listdir(data_dir))} ticker files...")
+    with os.scandir(data_dir) as it:
+        entries = list(it)
+    json_entries = [e for e in entries if e.name.endswith('.json')]
 
-    for filename in os.listdir(data_dir):
-        if not filename.endswith('.json'):
-            continue
+    print(f"Analyzing {len(entries)} ticker files...")
+
+    # One row per file, one column per numeric metric; NaN marks a missing
+    # value so the nan-aware reductions below skip it
+    metrics = np.full((len(json_entries), len(METRIC_FIELDS)), np.nan)
 
-        try:
-            with open(os.path.join(data_dir, filename), 'r') as f:
-                data = json.load(f)
-
-            # Summary stats
-            summary_stats = data.get('summary_stats', {})
-            score = summary_stats.get('overall_score')
-            if score is not None:
-                all_scores.append(score)
-            quality_counts[summary_stats.get('prediction_quality', 'unknown')] += 1
-
-            # OHLCV metrics
-            pred_metrics = data.get('data', {}).get('prediction_metrics', {})
-
-            # MAPE values (filter out None values)
-            if 'open_metrics' in pred_metrics:
-                mape = pred_metrics['open_metrics'].get('mape')
-                acc5 = pred_metrics['open_metrics'].get('accuracy_5pct')
-                acc10 = pred_metrics['open_metrics'].get('accuracy_10pct')
-                if mape is not None: open_mapes.append(mape)
-                if acc5 is not None: open_accuracy_5pct.append(acc5)
-                if acc10 is not None: open_accuracy_10pct.append(acc10)
-
-            if 'high_metrics' in pred_metrics:
-                mape = pred_metrics['high_metrics'].get('mape')
-                acc5 = pred_metrics['high_metrics'].get('accuracy_5pct')
-                acc10 = pred_metrics['high_metrics'].get('accuracy_10pct')
-                if mape is not None: high_mapes.append(mape)
-                if acc5 is not None: high_accuracy_5pct.append(acc5)
-                if acc10 is not None: high_accuracy_10pct.append(acc10)
-
-            if 'low_metrics' in pred_metrics:
-                mape = pred_metrics['low_metrics'].get('mape')
-                acc5 = pred_metrics['low_metrics'].get('accuracy_5pct')
-                acc10 = pred_metrics['low_metrics'].get('accuracy_10pct')
-                if mape is not None: low_mapes.append(mape)
-                if acc5 is not None: low_accuracy_5pct.append(acc5)
-                if acc10 is not None: low_accuracy_10pct.append(acc10)
-
-            if 'close_metrics' in pred_metrics:
-                mape = pred_metrics['close_metrics'].get('mape')
-                acc5 = pred_metrics['close_metrics'].get('accuracy_5pct')
-                acc10 = pred_metrics['close_metrics'].get('accuracy_10pct')
-                if mape is not None: close_mapes.append(mape)
-                if acc5 is not None: close_accuracy_5pct.append(acc5)
-                if acc10 is not None: close_accuracy_10pct.append(acc10)
-
-            # Model characteristics
-            model_info = data.get('data', {}).get('model_info', {})
-            model_types[model_info.get('model_type', 'unknown')] += 1
-            mc_simulations.append(model_info.get('monte_carlo_simulations', 0))
-
-            # Metadata
-            metadata = data.get('data', {}).get('metadata', {})
-            prediction_days.append(metadata.get('prediction_days', 0))
-            lookback_days.append(metadata.get('lookback_days', 0))
-
-        except Exception as e:
-            print(f"Error processing {filename}: {e}")
+    for i, m in enumerate(_parse_all(json_entries, cache_path)):
+        if m is None:
             continue
 
-    # Calculate summary statistics
+        quality_counts[m.quality] += 1
+        model_types[m.model_type] += 1
+        metrics[i] = [np.nan if v is None else v
+                      for v in (getattr(m, name) for name in METRIC_FIELDS)]
+
+    # Calculate summary statistics columnwise in a single pass each
+    counts = np.count_nonzero(~np.isnan(metrics), axis=0)
+    with warnings.catch_warnings():
+        # All-NaN columns are reported as 0 below
+        warnings.simplefilter('ignore', RuntimeWarning)
+        means = np.nanmean(metrics, axis=0)
+        medians = np.nanmedian(metrics, axis=0)
+
+    def stat(values, name, ndigits=None):
+        i = COLUMN[name]
+        if not counts[i]:
+            return 0
+        return int(values[i]) if ndigits is None else round(values[i], ndigits)
+
+    scores = metrics[:, COLUMN['score']]
+    scores = scores[~np.isnan(scores)]
+    if scores.size:
+        score_pcts = np.round(np.percentile(scores, [10, 25, 50, 75, 90]), 2)
+    else:
+        score_pcts = [0] * 5
+
+    def price_metrics(prefix):
+        return {
+            "mean_mape": stat(means, f"{prefix}_mape", 2),
+            "median_mape": stat(medians, f"{prefix}_mape", 2),
+            "mean_accuracy_5pct": stat(means, f"{prefix}_acc5", 1),
+            "mean_accuracy_10pct": stat(means, f"{prefix}_acc10", 1)
+        }
+
     summary = {
         "dataset_overview": {
-            "total_tickers": len(all_scores),
+            "total_tickers": int(scores.size),
             "model_type": "complete-ohlcv-monte-carlo",
-            "avg_lookback_days": int(np.mean(lookback_days)) if lookback_days else 0,
-            "avg_prediction_days": int(np.mean(prediction_days)) if prediction_days else 0,
-            "avg_mc_simulations": int(np.mean(mc_simulations)) if mc_simulations else 0
+            "avg_lookback_days": stat(means, 'lookback'),
+            "avg_prediction_days": stat(means, 'pred_days'),
+            "avg_mc_simulations": stat(means, 'mc_sims')
         },
         "overall_performance": {
-            "mean_score": round(np.mean(all_scores), 2) if all_scores else 0,
-            "median_score": round(np.median(all_scores), 2) if all_scores else 0,
-            "std_score": round(np.std(all_scores), 2) if all_scores else 0,
-            "min_score": round(np.min(all_scores), 2) if all_scores else 0,
-            "max_score": round(np.max(all_scores), 2) if all_scores else 0
+            "mean_score": round(scores.mean(), 2) if scores.size else 0,
+            "median_score": round(np.median(scores), 2) if scores.size else 0,
+            "std_score": round(scores.std(), 2) if scores.size else 0,
+            "min_score": round(scores.min(), 2) if scores.size else 0,
+            "max_score": round(scores.max(), 2) if scores.size else 0
         },
         "quality_distribution": dict(quality_counts),
         "accuracy_metrics": {
-            "open_price": {
-                "mean_mape": round(np.mean(open_mapes), 2) if open_mapes else 0,
-                "median_mape": round(np.median(open_mapes), 2) if open_mapes else 0,
-                "mean_accuracy_5pct": round(np.mean(open_accuracy_5pct), 1) if open_accuracy_5pct else 0,
-                "mean_accuracy_10pct": round(np.mean(open_accuracy_10pct), 1) if open_accuracy_10pct else 0
-            },
-            "high_price": {
-                "mean_mape": round(np.mean(high_mapes), 2) if high_mapes else 0,
-                "median_mape": round(np.median(high_mapes), 2) if high_mapes else 0,
-                "mean_accuracy_5pct": round(np.mean(high_accuracy_5pct), 1) if high_accuracy_5pct else 0,
-                "mean_accuracy_10pct": round(np.mean(high_accuracy_10pct), 1) if high_accuracy_10pct else 0
-            },
-            "low_price": {
-                "mean_mape": round(np.mean(low_mapes), 2) if low_mapes else 0,
-                "median_mape": round(np.median(low_mapes), 2) if low_mapes else 0,
-                "mean_accuracy_5pct": round(np.mean(low_accuracy_5pct), 1) if low_accuracy_5pct else 0,
-                "mean_accuracy_10pct": round(np.mean(low_accuracy_10pct), 1) if low_accuracy_10pct else 0
-            },
-            "close_price": {
-                "mean_mape": round(np.mean(close_mapes), 2) if close_mapes else 0,
-                "median_mape": round(np.median(close_mapes), 2) if close_mapes else 0,
-                "mean_accuracy_5pct": round(np.mean(close_accuracy_5pct), 1) if close_accuracy_5pct else 0,
-                "mean_accuracy_10pct": round(np.mean(close_accuracy_10pct), 1) if close_accuracy_10pct else 0
-            }
+            "open_price": price_metrics('open'),
+            "high_price": price_metrics('high'),
+            "low_price": price_metrics('low'),
+            "close_price": price_metrics('close')
         },
         "score_percentiles": {
-            "p10": round(np.percentile(all_scores, 10), 2) if all_scores else 0,
-            "p25": round(np.percentile(all_scores, 25), 2) if all_scores else 0,
-            "p50": round(np.percentile(all_scores, 50), 2) if all_scores else 0,
-            "p75": round(np.percentile(all_scores, 75), 2) if all_scores else 0,
-            "p90": round(np.percentile(all_scores, 90), 2) if all_scores else 0
+            "p10": score_pcts[0],
+            "p25": score_pcts[1],
+            "p50": score_pcts[2],
+            "p75": score_pcts[3],
+            "p90": score_pcts[4]
         }
     }
 
@@ -161,8 +305,7 @@ if __name__ == "__main__":
 
     # Output JSON for use in JavaScript
     output_file = "/workspaces/sjc-gpu-kronos/ohlcv-dashboard/data/dataset_summary.json"
-    with open(output_file, 'w') as f:
-        json.dump(summary, f, indent=2)
+    dump_json(summary, output_file)
 
     print(f"Summary statistics saved to: {output_file}")
     print(f"Total tickers analyzed: {summary['dataset_overview']['total_tickers']}")
@@ -6,22 +6,235 @@ Monitors prediction files and processes OHLCV data for Chart.js visualization
 
 import json
 import os
-import glob
-import time
+import hashlib
+import heapq
+import itertools
+import queue
+import re
+import subprocess
 from datetime import datetime, timedelta
 from collections import defaultdict
-import statistics
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 import sys
 import logging
+import threading
+import time
+import zlib
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def _load(path):
+    """Load a JSON file, using orjson when it is installed"""
+    with open(path, 'rb') as f:
+        if orjson is not None:
+            return orjson.loads(f.read())
+        return json.load(f)
+
+def _to_json(obj):
+    """JSON fallback for types the encoders do not know"""
+    if isinstance(obj, Candles):
+        return obj.to_records()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _encode(obj):
+    """Encode obj as indented JSON bytes, using orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_to_json,
+                            option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+                            | orjson.OPT_PASSTHROUGH_DATACLASS)
+    return json.dumps(obj, indent=2, default=_to_json).encode()
+
+def _dump(obj, path):
+    """Write obj as indented JSON with a single write"""
+    payload = _encode(obj)
+    with open(path, 'wb') as f:
+        f.write(payload)
+    return payload
+
+# Prediction file names: "<ticker>_ohlcv_prediction.json" or
+# "<ticker>_prediction_<timestamp>.json"; ticker lands in one of the groups
+PRED_RE = re.compile(r'^(?:(?P<ohlcv>.+)_ohlcv_prediction\.json|(?P<timestamped>.+?)_prediction_.*\.json)$')
+
+def classify_prediction_file(filename):
+    """Return (ticker, kind) for a prediction file name, or None"""
+    m = PRED_RE.match(filename)
+    if m is None:
+        return None
+    kind = m.lastgroup
+    return m.group(kind), kind
+
+# Processing order by kind: the last file processed for a ticker wins, so
+# timestamped files come after OHLCV ones to take precedence
+KIND_ORDER = {"ohlcv": 0, "timestamped": 1}
+
+def in_processing_order(paths):
+    """Sort prediction file paths by KIND_ORDER, keeping their order within a kind"""
+    return sorted(paths, key=lambda path: KIND_ORDER[classify_prediction_file(os.path.basename(path))[1]])
+
+# Candlestick output is split into this many shard files, keyed by ticker
+SHARD_COUNT = 256
+SHARD_DIR = "candlestick_shards"
+
+def shard_bucket(ticker):
+    """Stable shard number for a ticker (hash() is salted per process)"""
+    return zlib.crc32(ticker.encode()) % SHARD_COUNT
+
+def is_prediction_file(filename):
+    """Return True for OHLCV or timestamped prediction file names"""
+    return PRED_RE.match(filename) is not None
+
+CANDLE_VALUE_KEYS = ("open", "high", "low", "close", "volume")
+
+def _complete_candle(candle):
+    """Whether candle has a date and a numeric value for every OHLCV field"""
+    if not isinstance(candle, dict) or "date" not in candle:
+        return False
+    for key in CANDLE_VALUE_KEYS:
+        value = candle.get(key)
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return False
+    return True
+
+@dataclass
+class Candles:
+    """Candlesticks stored column-wise, one numpy array per field"""
+    dates: np.ndarray
+    open_: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    # JSON key for each column, in candle field order
+    KEYS = (("date", "dates"), ("open", "open_"), ("high", "high"),
+            ("low", "low"), ("close", "close"), ("volume", "volume"))
+
+    @classmethod
+    def from_records(cls, records):
+        """Build columns from a list of candle dicts
+
+        Candles missing a field or holding a non-numeric price or volume are
+        skipped. Volumes keep their JSON type: int64 when all are integers,
+        float64 when all are floats, otherwise the values as they came.
+        """
+        kept = [c for c in records if _complete_candle(c)]
+        if len(kept) < len(records):
+            logger.warning(f"Skipped {len(records) - len(kept)} incomplete candles")
+
+        n = len(kept)
+        columns = {"dates": np.array([c["date"] for c in kept], dtype=object)}
+        for key, attr in cls.KEYS[1:5]:
+            columns[attr] = np.fromiter((c[key] for c in kept), dtype=np.float64, count=n)
+
+        volumes = [c["volume"] for c in kept]
+        types = set(map(type, volumes))
+        dtype = np.int64 if types == {int} else np.float64 if types <= {float} else object
+        columns["volume"] = np.array(volumes, dtype=dtype)
+        return cls(**columns)
+
+    def to_records(self):
+        """Convert back to a list of candle dicts for JSON output"""
+        columns = [getattr(self, attr).tolist() for _, attr in self.KEYS]
+        keys = [key for key, _ in self.KEYS]
+        return [dict(zip(keys, row)) for row in zip(*columns)]
+
+    def __len__(self):
+        return len(self.dates)
+
+class PredictionFileHandler(FileSystemEventHandler):
+    """Queue prediction files as the filesystem reports them written"""
+
+    def __init__(self, events):
+        super().__init__()
+        self.events = events
+
+    def _enqueue(self, path):
+        if is_prediction_file(os.path.basename(path)):
+            self.events.put(path)
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._enqueue(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._enqueue(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._enqueue(event.dest_path)
+
+class TopK:
+    """Incrementally ranked tickers; superseded entries are dropped lazily"""
+
+    def __init__(self, k=10, largest=True):
+        self.k = k
+        self.sign = -1 if largest else 1
+        self.heap = []
+        self.live = {}
+        self.stale = 0
+        self.counter = itertools.count()
+
+    def upsert(self, ticker, value, item):
+        """Insert or replace the entry for ticker, O(log N)"""
+        if ticker in self.live:
+            self.stale += 1
+        # Ties rank in update order, like the stable sort this replaces
+        entry = (self.sign * value, next(self.counter), ticker, item)
+        self.live[ticker] = entry
+        heapq.heappush(self.heap, entry)
+
+        if self.stale > len(self.live):
+            self.heap = list(self.live.values())
+            heapq.heapify(self.heap)
+            self.stale = 0
+
+    def top(self):
+        """Return the k best items, O(k log N) plus any stale entries skipped"""
+        best = []
+        while self.heap and len(best) < self.k:
+            entry = heapq.heappop(self.heap)
+            if self.live.get(entry[2]) is entry:
+                best.append(entry)
+            else:
+                self.stale -= 1
+        for entry in best:
+            heapq.heappush(self.heap, entry)
+        return [entry[3] for entry in best]
+
 class CandlestickDataProcessor:
-    def __init__(self, data_folder="/home/jarden/transformers-predictions/data/"):
+    def __init__(self, data_folder="/home/jarden/transformers-predictions/data/", settle_seconds=1.0,
+                 poll_seconds=10, hook_interval=60):
         self.data_folder = data_folder
+        # Quiet period that ends a burst of file events in watch mode
+        self.settle_seconds = settle_seconds
+        # Rescan interval when watchdog is unavailable; set wakeup to rescan now
+        self.poll_seconds = poll_seconds
+        self.wakeup = threading.Event()
         self.processed_files = set()
+        # (mtime_ns, size) of each prediction file when it was last picked up
+        self.file_stats = {}
+
+        # Swarm memory hooks run at most once per interval, after a save
+        self.hook_interval = hook_interval
+        self.hooks_dirty = False
+        self.last_hook_run = None
         self.market_overview = {
             "total_tickers": 0,
             "bullish_count": 0,
@@ -35,80 +248,188 @@ class CandlestickDataProcessor:
         }
         self.candlestick_data = {}
 
+        # Tickers per output shard, and shards changed since the last save
+        self.shard_tickers = defaultdict(set)
+        self.dirty_shards = set()
+        self.shard_manifest = {}
+
+        # Rankings and trend buckets, maintained as tickers are processed
+        self.gainers = TopK(largest=True)
+        self.losers = TopK(largest=False)
+        self.volume_leaders = TopK(largest=True)
+        self.volatile_stocks = TopK(largest=True)
+        self.trends = {}
+        self.trend_counts = {"bullish": 0, "bearish": 0, "neutral": 0}
+
     def monitor_and_process(self, watch_mode=False):
         """Monitor for new files and process them"""
         logger.info("Starting candlestick data processing...")
 
         if watch_mode:
             logger.info("Watching for new files...")
-            while True:
-                self.process_new_files()
-                time.sleep(10)  # Check every 10 seconds
+            try:
+                if Observer is not None:
+                    self.watch_events()
+                else:
+                    logger.info(f"watchdog not installed, polling every {self.poll_seconds} seconds")
+                    while True:
+                        self.process_new_files()
+                        self.store_in_memory()
+                        if self.wakeup.wait(self.poll_seconds):
+                            self.wakeup.clear()
+            finally:
+                # Publish any save that was throttled
+                self.store_in_memory(force=True)
         else:
             # Single run processing
             self.process_all_files()
 
+    def watch_events(self):
+        """Process prediction files as filesystem events report them"""
+        events = queue.Queue()
+        observer = Observer()
+        observer.schedule(PredictionFileHandler(events), self.data_folder, recursive=False)
+        observer.start()
+
+        try:
+            # Backfill files written before the observer started
+            self.process_new_files()
+
+            while True:
+                # Wait for a burst of events to settle so partially written
+                # files are picked up once, after their final write
+                try:
+                    batch = {events.get(timeout=self.hook_interval)}
+                except queue.Empty:
+                    # Idle: publish a save the hook throttle held back
+                    self.store_in_memory()
+                    continue
+                while True:
+                    try:
+                        batch.add(events.get(timeout=self.settle_seconds))
+                    except queue.Empty:
+                        break
+
+                # Drop events for files the backfill or an earlier batch
+                # already processed in their current state
+                changed = self.filter_changed(sorted(batch))
+                if not changed:
+                    continue
+
+                logger.info(f"Found {len(changed)} new or updated files to process")
+                self.process_files(in_processing_order(changed))
+
+                self.update_market_overview()
+                self.save_processed_data()
+        finally:
+            observer.stop()
+            observer.join()
+
     def process_new_files(self):
-        """Process any new prediction files"""
-        prediction_files = self.find_prediction_files()
-        new_files = [f for f in prediction_files if f not in self.processed_files]
+        """Process any new or modified prediction files"""
+        new_files = self.scan_changed_files()
 
         if new_files:
             logger.info(f"Found {len(new_files)} new files to process")
-            for file_path in new_files:
-                self.process_prediction_file(file_path)
-                self.processed_files.add(file_path)
+            self.process_files(new_files)
 
             self.update_market_overview()
             self.save_processed_data()
 
+    def scan_changed_files(self):
+        """Return prediction files changed since the last scan, in processing order"""
+        changed = []
+        # DirEntry.stat() reuses the directory read, so one pass covers all files
+        with os.scandir(self.data_folder) as it:
+            for entry in it:
+                if is_prediction_file(entry.name) and self._record_stat(entry.path, entry.stat()):
+                    changed.append(entry.path)
+        return in_processing_order(changed)
+
+    def filter_changed(self, paths):
+        """Return the paths that still exist and changed since they were last picked up"""
+        changed = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if self._record_stat(path, st):
+                changed.append(path)
+        return changed
+
+    def _record_stat(self, path, st):
+        """Remember path's (mtime_ns, size); True when it differs from the last one seen"""
+        key = (st.st_mtime_ns, st.st_size)
+        if self.file_stats.get(path) == key:
+            return False
+        self.file_stats[path] = key
+        return True
+
     def process_all_files(self):
         """Process all available prediction files"""
         prediction_files = self.find_prediction_files()
         logger.info(f"Processing {len(prediction_files)} prediction files...")
 
-        for file_path in prediction_files:
-            self.process_prediction_file(file_path)
-            self.processed_files.add(file_path)
+        self.process_files(prediction_files)
 
         self.update_market_overview()
         self.save_processed_data()
 
+    def process_files(self, file_paths, max_workers=16):
+        """Read and process files on a thread pool, then store results in order"""
+        # Workers only read and extract; all shared state is updated here
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for file_path, (ticker, processed_data) in zip(
+                    file_paths, executor.map(self._load_and_process, file_paths)):
+                self._store(file_path, ticker, processed_data)
+                self.processed_files.add(file_path)
+
     def find_prediction_files(self):
         """Find all prediction JSON files in the data folder"""
         # Look for both OHLCV and timestamped prediction files
-        ohlcv_files = glob.glob(os.path.join(self.data_folder, "*_ohlcv_prediction.json"))
-        timestamped_files = glob.glob(os.path.join(self.data_folder, "*_prediction_*.json"))
+        with os.scandir(self.data_folder) as it:
+            files = [entry.path for entry in it if is_prediction_file(entry.name)]
 
-        return ohlcv_files + timestamped_files
+        return in_processing_order(files)
 
     def process_prediction_file(self, file_path):
         """Process a single prediction file"""
-        try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
+        ticker, processed_data = self._load_and_process(file_path)
+        self._store(file_path, ticker, processed_data)
 
+    def _load_and_process(self, file_path):
+        """Load one prediction file and return (ticker, processed data)"""
+        try:
             filename = os.path.basename(file_path)
 
             # Determine file type and extract ticker
-            if "_ohlcv_prediction.json" in filename:
-                ticker = filename.replace("_ohlcv_prediction.json", "")
-                processed_data = self.process_ohlcv_file(data, ticker)
-            elif "_prediction_" in filename:
-                # Extract ticker from timestamped file
-                ticker = filename.split("_prediction_")[0]
-                processed_data = self.process_timestamped_file(data, ticker)
-            else:
+            match = classify_prediction_file(filename)
+            if match is None:
                 logger.warning(f"Unknown file format: {filename}")
-                return
+                return None, None
 
-            if processed_data:
-                self.candlestick_data[ticker] = processed_data
-                logger.info(f"Processed {ticker} from {filename}")
+            ticker, kind = match
+            data = _load(file_path)
+            if kind == "ohlcv":
+                return ticker, self.process_ohlcv_file(data, ticker)
+            return ticker, self.process_timestamped_file(data, ticker)
 
         except Exception as e:
             logger.error(f"Error processing {file_path}: {e}")
 
+        return None, None
+
+    def _store(self, file_path, ticker, processed_data):
+        """Record a processed ticker and update the rankings"""
+        if processed_data:
+            self.candlestick_data[ticker] = processed_data
+            self.index_ticker(ticker, processed_data)
+            bucket = shard_bucket(ticker)
+            self.shard_tickers[bucket].add(ticker)
+            self.dirty_shards.add(bucket)
+            logger.info(f"Processed {ticker} from {os.path.basename(file_path)}")
+
     def process_ohlcv_file(self, data, ticker):
         """Process OHLCV prediction file format"""
         try:
@@ -118,40 +439,36 @@ class CandlestickDataProcessor:
             chart_data = data["chart_data"]
 
             # Extract historical candlesticks
-            historical = chart_data.get("historical_candlesticks", [])
-            actual = chart_data.get("actual_candlesticks", [])
+            historical = Candles.from_records(chart_data.get("historical_candlesticks", []))
+            actual = Candles.from_records(chart_data.get("actual_candlesticks", []))
 
             # Get latest price for trend analysis
             latest_price = None
-            if actual:
-                latest_price = actual[-1]["close"]
-            elif historical:
-                latest_price = historical[-1]["close"]
+            if len(actual):
+                latest_price = float(actual.close[-1])
+            elif len(historical):
+                latest_price = float(historical.close[-1])
 
             # Calculate price change from historical to actual
             price_change = 0
             price_change_percent = 0
-            if historical and actual:
-                start_price = historical[-1]["close"]
-                end_price = actual[-1]["close"]
-                price_change = end_price - start_price
-                price_change_percent = (price_change / start_price) * 100
+            if len(historical) and len(actual):
+                start_price = historical.close[-1]
+                end_price = actual.close[-1]
+                price_change = float(end_price - start_price)
+                price_change_percent = float((end_price - start_price) / start_price * 100)
 
             # Get volume data
-            volume_data = []
-            if actual:
-                volume_data = [candle["volume"] for candle in actual[-5:]]  # Last 5 days
-            elif historical:
-                volume_data = [candle["volume"] for candle in historical[-5:]]
+            volumes = (actual if len(actual) else historical).volume[-5:]  # Last 5 days
 
-            avg_volume = statistics.mean(volume_data) if volume_data else 0
+            avg_volume = float(volumes.mean()) if volumes.size else 0
 
             # Calculate volatility (price range)
             volatility = 0
-            if actual:
-                prices = [candle["close"] for candle in actual[-10:]]  # Last 10 days
-                if len(prices) > 1:
-                    volatility = statistics.stdev(prices) / statistics.mean(prices) * 100
+            if len(actual):
+                closes = actual.close[-10:]  # Last 10 days
+                if closes.size > 1:
+                    volatility = float(closes.std(ddof=1) / closes.mean() * 100)
 
             return {
                 "ticker": ticker,
@@ -182,16 +499,7 @@ class CandlestickDataProcessor:
             market_data = data.get("market_data", {})
 
             # Format as candlestick data
-            candlesticks = []
-            for item in ohlcv_data:
-                candlesticks.append({
-                    "date": item["date"],
-                    "open": item["open"],
-                    "high": item["high"],
-                    "low": item["low"],
-                    "close": item["close"],
-                    "volume": item["volume"]
-                })
+            candlesticks = Candles.from_records(ohlcv_data)
 
             latest_price = market_data.get("latest_close", 0)
             volatility = market_data.get("volatility_percent", 0)
@@ -201,15 +509,15 @@ class CandlestickDataProcessor:
             price_change = 0
             price_change_percent = 0
             if len(candlesticks) >= 5:
-                start_price = candlesticks[-5]["close"]
-                end_price = candlesticks[-1]["close"]
-                price_change = end_price - start_price
-                price_change_percent = (price_change / start_price) * 100
+                start_price = candlesticks.close[-5]
+                end_price = candlesticks.close[-1]
+                price_change = float(end_price - start_price)
+                price_change_percent = float((end_price - start_price) / start_price * 100)
 
             return {
                 "ticker": ticker,
                 "historical_candlesticks": candlesticks,
-                "actual_candlesticks": [],
+                "actual_candlesticks": Candles.from_records([]),
                 "monte_carlo_simulations": [],
                 "latest_price": latest_price,
                 "price_change": price_change,
@@ -225,102 +533,124 @@ class CandlestickDataProcessor:
             logger.error(f"Error processing timestamped file for {ticker}: {e}")
             return None
 
+    def index_ticker(self, ticker, data):
+        """Update trend counts and rankings for one processed ticker"""
+        price_change_pct = data.get("price_change_percent", 0)
+        price = data.get("latest_price", 0)
+
+        # Categorize trend
+        if price_change_pct > 1:
+            trend = "bullish"
+        elif price_change_pct < -1:
+            trend = "bearish"
+        else:
+            trend = "neutral"
+
+        previous = self.trends.get(ticker)
+        if previous is not None:
+            self.trend_counts[previous] -= 1
+        self.trends[ticker] = trend
+        self.trend_counts[trend] += 1
+
+        # Update rankings
+        change = {
+            "ticker": ticker,
+            "change_percent": price_change_pct,
+            "price": price
+        }
+        self.gainers.upsert(ticker, price_change_pct, change)
+        self.losers.upsert(ticker, price_change_pct, change)
+
+        volume = data.get("average_volume", 0)
+        self.volume_leaders.upsert(ticker, volume, {
+            "ticker": ticker,
+            "volume": volume,
+            "price": price
+        })
+
+        volatility = data.get("volatility", 0)
+        self.volatile_stocks.upsert(ticker, volatility, {
+            "ticker": ticker,
+            "volatility": volatility,
+            "price": price
+        })
+
     def update_market_overview(self):
         """Update market overview statistics"""
         if not self.candlestick_data:
             return
 
         total_tickers = len(self.candlestick_data)
-        bullish = []
-        bearish = []
-        neutral = []
-
-        gainers = []
-        losers = []
-        volume_leaders = []
-        volatile_stocks = []
-
-        for ticker, data in self.candlestick_data.items():
-            price_change_pct = data.get("price_change_percent", 0)
-
-            # Categorize trend
-            if price_change_pct > 1:
-                bullish.append(ticker)
-            elif price_change_pct < -1:
-                bearish.append(ticker)
-            else:
-                neutral.append(ticker)
-
-            # Collect for rankings
-            gainers.append({
-                "ticker": ticker,
-                "change_percent": price_change_pct,
-                "price": data.get("latest_price", 0)
-            })
-
-            volume_leaders.append({
-                "ticker": ticker,
-                "volume": data.get("average_volume", 0),
-                "price": data.get("latest_price", 0)
-            })
-
-            volatile_stocks.append({
-                "ticker": ticker,
-                "volatility": data.get("volatility", 0),
-                "price": data.get("latest_price", 0)
-            })
-
-        # Sort and get top performers
-        gainers.sort(key=lambda x: x["change_percent"], reverse=True)
-        losers = sorted(gainers, key=lambda x: x["change_percent"])[:10]
-        gainers = gainers[:10]
-
-        volume_leaders.sort(key=lambda x: x["volume"], reverse=True)
-        volume_leaders = volume_leaders[:10]
-
-        volatile_stocks.sort(key=lambda x: x["volatility"], reverse=True)
-        volatile_stocks = volatile_stocks[:10]
 
         self.market_overview = {
             "total_tickers": total_tickers,
-            "bullish_count": len(bullish),
-            "bearish_count": len(bearish),
-            "neutral_count": len(neutral),
-            "top_gainers": gainers,
-            "top_losers": losers,
-            "highest_volume": volume_leaders,
-            "most_volatile": volatile_stocks,
+            "bullish_count": self.trend_counts["bullish"],
+            "bearish_count": self.trend_counts["bearish"],
+            "neutral_count": self.trend_counts["neutral"],
+            "top_gainers": self.gainers.top(),
+            "top_losers": self.losers.top(),
+            "highest_volume": self.volume_leaders.top(),
+            "most_volatile": self.volatile_stocks.top(),
             "last_updated": datetime.now().isoformat()
         }
 
-        logger.info(f"Market overview updated: {total_tickers} tickers, {len(bullish)} bullish, {len(bearish)} bearish")
+        logger.info(f"Market overview updated: {total_tickers} tickers, "
+                    f"{self.trend_counts['bullish']} bullish, {self.trend_counts['bearish']} bearish")
 
     def save_processed_data(self):
         """Save processed data to files for the web app"""
         try:
-            # Save candlestick data
-            candlestick_file = os.path.join(self.data_folder, "processed_candlestick_data.json")
-            with open(candlestick_file, 'w') as f:
-                json.dump(self.candlestick_data, f, indent=2)
+            # Save candlestick data, rewriting only the shards that changed
+            self.save_dirty_shards()
 
             # Save market overview
             overview_file = os.path.join(self.data_folder, "market_overview.json")
-            with open(overview_file, 'w') as f:
-                json.dump(self.market_overview, f, indent=2)
+            _dump(self.market_overview, overview_file)
 
             logger.info(f"Saved processed data: {len(self.candlestick_data)} tickers")
 
             # Store in memory for swarm coordination
+            self.hooks_dirty = True
             self.store_in_memory()
 
         except Exception as e:
             logger.error(f"Error saving processed data: {e}")
 
-    def store_in_memory(self):
-        """Store processed data in swarm memory"""
-        try:
-            import subprocess
+    def save_dirty_shards(self):
+        """Rewrite changed candlestick shards, then the manifest that lists them"""
+        shard_dir = os.path.join(self.data_folder, SHARD_DIR)
+        os.makedirs(shard_dir, exist_ok=True)
+
+        for bucket in sorted(self.dirty_shards):
+            tickers = sorted(self.shard_tickers[bucket])
+            name = f"{bucket:02x}.json"
+            payload = _dump({t: self.candlestick_data[t] for t in tickers},
+                            os.path.join(shard_dir, name))
+            # Content hash lets clients refetch only shards that changed
+            self.shard_manifest[name] = {
+                "hash": hashlib.blake2b(payload, digest_size=8).hexdigest(),
+                "tickers": tickers
+            }
+
+        logger.info(f"Rewrote {len(self.dirty_shards)} of {len(self.shard_manifest)} candlestick shards")
+        self.dirty_shards.clear()
+
+        _dump({
+            "shard_count": SHARD_COUNT,
+            "total_tickers": len(self.candlestick_data),
+            "shards": dict(sorted(self.shard_manifest.items())),
+            "last_updated": datetime.now().isoformat()
+        }, os.path.join(shard_dir, "manifest.json"))
 
+    def store_in_memory(self, force=False):
+        """Store processed data in swarm memory, throttled to one run per hook_interval"""
+        if not self.hooks_dirty:
+            return
+        now = time.monotonic()
+        if not force and self.last_hook_run is not None and now - self.last_hook_run < self.hook_interval:
+            return
+
+        try:
             # Store candlestick data
             candlestick_summary = {
                 "total_tickers": len(self.candlestick_data),
@@ -334,24 +664,32 @@ class CandlestickDataProcessor:
                 data_type = data.get("data_type", "unknown")
                 candlestick_summary["data_types"][data_type] = candlestick_summary["data_types"].get(data_type, 0) + 1
 
-            # Store in memory using hooks
-            subprocess.run([
-                "npx", "claude-flow@alpha", "hooks", "post-edit",
-                "--memory-key", "swarm/data/candlestick",
-                "--file", "processed_candlestick_data.json"
-            ], cwd="/home/jarden/transformers-predictions", capture_output=True)
-
-            subprocess.run([
-                "npx", "claude-flow@alpha", "hooks", "post-edit",
-                "--memory-key", "swarm/data/market_overview",
-                "--file", "market_overview.json"
-            ], cwd="/home/jarden/transformers-predictions", capture_output=True)
+            # Store in memory using hooks; both run concurrently
+            hooks = [
+                subprocess.Popen([
+                    "npx", "claude-flow@alpha", "hooks", "post-edit",
+                    "--memory-key", memory_key,
+                    "--file", file_name
+                ], cwd="/home/jarden/transformers-predictions",
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                for memory_key, file_name in (
+                    ("swarm/data/candlestick", f"{SHARD_DIR}/manifest.json"),
+                    ("swarm/data/market_overview", "market_overview.json"),
+                )
+            ]
+            for hook in hooks:
+                hook.wait()
 
             logger.info("Data stored in swarm memory successfully")
 
         except Exception as e:
             logger.warning(f"Could not store in swarm memory: {e}")
 
+        finally:
+            # A failed run is not retried until the next interval either
+            self.hooks_dirty = False
+            self.last_hook_run = now
+
     def get_summary_stats(self):
         """Get summary statistics for monitoring"""
         return {
@@ -1,40 +1,139 @@
 #!/usr/bin/env python3
 
+import json
+import os
+import subprocess
+import sys
+
+try:
+    import esprima
+except ImportError:
+    esprima = None
+
+APP_JS = '/home/jarden/transformers-predictions/app.js'
+NEW_FUNCTION_JS = '/home/jarden/transformers-predictions/app_chart_fix.js'
+FUNCTION_NAME = 'createChart'
+FUNCTION_TYPES = ('MethodDefinition', 'FunctionDeclaration')
+ACORN_MISSING = 3
+
+# Reads the source on stdin and prints the [start, end) offsets of the named
+# method/function, or null. acorn understands the ES2020+ syntax app.js uses
+# (optional chaining, nullish coalescing) that esprima-python rejects.
+# Offsets are in UTF-16 code units, like all JS string positions.
+ACORN_LOCATE = r"""
+let acorn;
+try {
+    acorn = require('acorn');
+} catch (e) {
+    process.exit(%d);
+}
+const [name, types] = [process.argv[1], process.argv[2].split(',')];
+let src = '';
+process.stdin.on('data', chunk => src += chunk);
+process.stdin.on('end', () => {
+    const stack = [acorn.parse(src, {ecmaVersion: 'latest', sourceType: 'script'})];
+    while (stack.length) {
+        const node = stack.pop();
+        if (types.includes(node.type) && (node.key || node.id || {}).name === name) {
+            console.log(JSON.stringify([node.start, node.end]));
+            return;
+        }
+        for (const value of Object.values(node)) {
+            for (const child of [].concat(value)) {
+                if (child && typeof child.type === 'string') stack.push(child);
+            }
+        }
+    }
+    console.log('null');
+});
+""" % ACORN_MISSING
+
+
+class ParserUnavailable(Exception):
+    """The JS parser a locator needs is not installed."""
+
+
+def utf16_to_index(src, offset):
+    """Convert a UTF-16 code unit offset into src to a Python str index."""
+    return len(src.encode('utf-16-le')[:2 * offset].decode('utf-16-le'))
+
+
+def locate_with_acorn(src):
+    """Return the (start, end) str indices of the function via node + acorn, or None.
+
+    require('acorn') resolves from the project directory of APP_JS, so run
+    `npm install --save-dev acorn` there first.
+    """
+    try:
+        proc = subprocess.run(
+            ['node', '--eval', ACORN_LOCATE, FUNCTION_NAME, ','.join(FUNCTION_TYPES)],
+            input=src, capture_output=True, text=True, encoding='utf-8',
+            cwd=os.path.dirname(APP_JS),
+        )
+    except OSError:
+        raise ParserUnavailable('node is not installed')
+    if proc.returncode == ACORN_MISSING:
+        raise ParserUnavailable('acorn is not installed (npm install --save-dev acorn)')
+    if proc.returncode != 0:
+        return None
+    span = json.loads(proc.stdout)
+    # acorn counts UTF-16 code units; app.js has emoji outside the BMP
+    return tuple(utf16_to_index(src, offset) for offset in span) if span else None
+
+
+def locate_with_esprima(src):
+    """Return the (start, end) char offsets of the function via esprima-python, or None."""
+    if esprima is None:
+        raise ParserUnavailable('esprima is not installed (pip install esprima)')
+    found = []
+
+    def visit(node, metadata):
+        key = getattr(node, 'key', None) or getattr(node, 'id', None)
+        if node.type in FUNCTION_TYPES and getattr(key, 'name', None) == FUNCTION_NAME:
+            found.append(tuple(node.range))
+
+    try:
+        esprima.parseScript(src, {'range': True}, visit)
+    except esprima.Error:
+        return None
+    return found[0] if found else None
+
+
 # Read the original file
-with open('/home/jarden/transformers-predictions/app.js', 'r') as f:
-    lines = f.readlines()
+with open(APP_JS, 'r', encoding='utf-8') as f:
+    src = f.read()
 
 # Read the new createChart function
-with open('/home/jarden/transformers-predictions/app_chart_fix.js', 'r') as f:
-    new_function = f.read()
-
-# Find the createChart function boundaries
-start_line = None
-end_line = None
-brace_count = 0
-in_function = False
-
-for i, line in enumerate(lines):
-    if 'createChart(data) {' in line:
-        start_line = i
-        in_function = True
-        brace_count = 1
+with open(NEW_FUNCTION_JS, 'r', encoding='utf-8') as f:
+    new_function = f.read().strip()
+
+# Find the createChart function boundaries from the parsed AST
+span = None
+missing = []
+for locate in (locate_with_acorn, locate_with_esprima):
+    try:
+        span = locate(src)
+    except ParserUnavailable as e:
+        missing.append(str(e))
         continue
+    if span is not None:
+        break
+
+if span is None and len(missing) == 2:
+    sys.exit(f"No JS parser available: {'; '.join(missing)}")
 
-    if in_function:
-        brace_count += line.count('{') - line.count('}')
-        if brace_count == 0:
-            end_line = i
-            break
+if span is not None:
+    start, end = span
 
-if start_line is not None and end_line is not None:
     # Replace the function
-    new_lines = lines[:start_line] + [new_function + '\n'] + lines[end_line+1:]
+    new_src = src[:start] + new_function + src[end:]
 
     # Write the result
-    with open('/home/jarden/transformers-predictions/app.js', 'w') as f:
-        f.writelines(new_lines)
+    with open(APP_JS, 'w', encoding='utf-8') as f:
+        f.write(new_src)
 
-    print(f"Replaced createChart function from line {start_line+1} to {end_line+1}")
+    start_line = src.count('\n', 0, start) + 1
+    end_line = src.count('\n', 0, end) + 1
+    print(f"Replaced {FUNCTION_NAME} function from line {start_line} to {end_line}")
 else:
-    print("Could not find createChart function")
\ No newline at end of file
+    sys.exit(f"Could not find {FUNCTION_NAME} function in {APP_JS}")
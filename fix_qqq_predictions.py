@@ -8,10 +8,36 @@ import numpy as np
 from datetime import datetime, timedelta
 import pandas as pd
 
-def fix_qqq_predictions():
+from prediction_io import dump_json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+QQQ_FILE = '/home/jarden/transformers-predictions/data/QQQ_ohlcv_prediction.json'
+
+# Seed for the prediction and Monte Carlo draws, so reruns give the same file
+SEED = 0
+
+def _load(path):
+    """Load a JSON file, using orjson when it is installed"""
+    with open(path, 'rb') as f:
+        if orjson is not None:
+            return orjson.loads(f.read())
+        return json.load(f)
+
+def simulate_closes(rng, last_close, n_paths, n_days, mu, sigma):
+    """Simulate compounded close paths from a single (n_paths, n_days) draw"""
+    returns = rng.normal(mu, sigma, (n_paths, n_days))
+    return last_close * np.cumprod(1 + returns, axis=1)
+
+def fix_qqq_predictions(seed=SEED):
+    # One generator for every random draw below
+    rng = np.random.default_rng(seed)
+
     # Load current QQQ data
-    with open('/home/jarden/transformers-predictions/data/QQQ_ohlcv_prediction.json', 'r') as f:
-        data = json.load(f)
+    data = _load(QQQ_FILE)
 
     # Fix the year in historical dates (2025 -> 2024)
     for candlestick in data['data']['historical_candlesticks']:
@@ -35,46 +61,45 @@ def fix_qqq_predictions():
             predicted_dates.append(current_date.strftime('%Y-%m-%d'))
 
     # Generate realistic predictions with slight upward bias
-    predicted_candlesticks = []
-    current_price = last_close
-
-    for date in predicted_dates:
-        # Generate daily returns with slight positive bias
-        daily_return = np.random.normal(0.001, 0.01)  # 0.1% mean, 1% std dev
-        current_price *= (1 + daily_return)
-
-        # Generate OHLC values
-        daily_volatility = current_price * 0.005  # 0.5% intraday volatility
-        open_price = current_price + np.random.normal(0, daily_volatility)
-        high_price = max(open_price, current_price) + abs(np.random.normal(0, daily_volatility))
-        low_price = min(open_price, current_price) - abs(np.random.normal(0, daily_volatility))
-        close_price = current_price
-
-        predicted_candlesticks.append({
+    # 0.1% mean, 1% std dev daily returns
+    closes = simulate_closes(rng, last_close, 1, len(predicted_dates), 0.001, 0.01)[0]
+
+    # Generate OHLC values from one (n_days, 3) draw: open, high and low noise
+    daily_volatility = closes * 0.005  # 0.5% intraday volatility
+    noise = rng.standard_normal((len(predicted_dates), 3)) * daily_volatility[:, None]
+    opens = closes + noise[:, 0]
+    highs = np.maximum(opens, closes) + np.abs(noise[:, 1])
+    lows = np.minimum(opens, closes) - np.abs(noise[:, 2])
+    volumes = rng.normal(50000000, 10000000, len(predicted_dates)).astype(int)  # Average 50M volume
+
+    predicted_candlesticks = [
+        {
             'date': date,
-            'open': round(open_price, 2),
-            'high': round(high_price, 2),
-            'low': round(low_price, 2),
-            'close': round(close_price, 2),
-            'volume': int(np.random.normal(50000000, 10000000))  # Average 50M volume
-        })
+            'open': o,
+            'high': h,
+            'low': l,
+            'close': c,
+            'volume': v
+        }
+        for date, o, h, l, c, v in zip(
+            predicted_dates,
+            np.round(opens, 2).tolist(),
+            np.round(highs, 2).tolist(),
+            np.round(lows, 2).tolist(),
+            np.round(closes, 2).tolist(),
+            volumes.tolist()
+        )
+    ]
 
     # Add predicted candlesticks
     data['data']['predicted_candlesticks'] = predicted_candlesticks
 
-    # Generate Monte Carlo paths (10 simulations)
-    monte_carlo_paths = []
-    for _ in range(10):
-        path = []
-        sim_price = last_close
-        for date in predicted_dates:
-            daily_return = np.random.normal(0.0005, 0.012)  # Slightly wider range
-            sim_price *= (1 + daily_return)
-            path.append({
-                'date': date,
-                'close': round(sim_price, 2)
-            })
-        monte_carlo_paths.append(path)
+    # Generate Monte Carlo paths (10 simulations, slightly wider range)
+    mc_closes = np.round(simulate_closes(rng, last_close, 10, len(predicted_dates), 0.0005, 0.012), 2)
+    monte_carlo_paths = [
+        [{'date': date, 'close': close} for date, close in zip(predicted_dates, path)]
+        for path in mc_closes.tolist()
+    ]
 
     # Update chart_data structure
     if 'chart_data' not in data:
@@ -84,38 +109,16 @@ def fix_qqq_predictions():
     data['chart_data']['predicted'] = predicted_candlesticks
     data['chart_data']['monte_carlo_paths'] = monte_carlo_paths
 
-    # Generate confidence bands
+    # Generate confidence bands from every Monte Carlo path plus the main
+    # prediction: one (n_paths + 1, n_days) array, one percentile call
+    combined = np.vstack([mc_closes, np.round(closes, 2)])
+    percentiles = [90, 75, 50, 25, 10]
+    bands = np.round(np.percentile(combined, percentiles, axis=0), 2).tolist()
     confidence_bands = {
-        'p90': [], 'p75': [], 'p50': [], 'p25': [], 'p10': []
+        f'p{q}': [{'date': date, 'value': value} for date, value in zip(predicted_dates, band)]
+        for q, band in zip(percentiles, bands)
     }
 
-    for i, date in enumerate(predicted_dates):
-        # Collect all Monte Carlo values for this date
-        values = [path[i]['close'] for path in monte_carlo_paths]
-        values.append(predicted_candlesticks[i]['close'])  # Add main prediction
-
-        # Calculate percentiles
-        confidence_bands['p90'].append({
-            'date': date,
-            'value': round(np.percentile(values, 90), 2)
-        })
-        confidence_bands['p75'].append({
-            'date': date,
-            'value': round(np.percentile(values, 75), 2)
-        })
-        confidence_bands['p50'].append({
-            'date': date,
-            'value': round(np.percentile(values, 50), 2)
-        })
-        confidence_bands['p25'].append({
-            'date': date,
-            'value': round(np.percentile(values, 25), 2)
-        })
-        confidence_bands['p10'].append({
-            'date': date,
-            'value': round(np.percentile(values, 10), 2)
-        })
-
     data['chart_data']['confidence_bands'] = confidence_bands
 
     # Update summary stats
@@ -139,8 +142,7 @@ def fix_qqq_predictions():
     data['ticker_info']['last_update'] = datetime.now().isoformat()
 
     # Save fixed file
-    with open('/home/jarden/transformers-predictions/data/QQQ_ohlcv_prediction.json', 'w') as f:
-        json.dump(data, f, indent=2)
+    dump_json(data, QQQ_FILE)
 
     print(f"Fixed QQQ predictions:")
     print(f"- Historical dates: {data['data']['historical_candlesticks'][0]['date']} to {data['data']['historical_candlesticks'][-1]['date']}")
@@ -1,68 +1,198 @@
 #!/usr/bin/env python3
+import hashlib
 import json
 import os
-import glob
+import random
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
+from prediction_io import dump_json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Number of prediction files analyze_predictions samples for its statistics
+SAMPLE_SIZE = 500
+
+# Sidecar cache of per-file results: {"version": ..., "files": {path: [mtime_ns, size, pct_change]}}
+STATS_CACHE = 'data/.stats_cache.json'
+
+# Cached results are only valid for the parsing code that produced them, so
+# the cache records a hash of this file and starts over when it changes
+with open(__file__, 'rb') as _f:
+    CACHE_VERSION = hashlib.blake2b(_f.read(), digest_size=8).hexdigest()
+
+def _load(path):
+    """Load a JSON file, using orjson when it is installed"""
+    with open(path, 'rb') as f:
+        if orjson is not None:
+            return orjson.loads(f.read())
+        return json.load(f)
+
+def _load_cache(path):
+    """Load the per-file results, or none if the cache is missing, unreadable or from other code"""
+    try:
+        cache = _load(path)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get('version') != CACHE_VERSION:
+        return {}
+    return cache.get('files', {})
+
+def _save_cache(files, path):
+    """Write the per-file results with the current CACHE_VERSION"""
+    dump_json({'version': CACHE_VERSION, 'files': files}, path)
+
+# Candlestick arrays whose last close analyze_predictions compares
+TAIL_ARRAYS = {
+    'chart_data.historical_candlesticks': 'historical',
+    'chart_data.predicted_candlesticks': 'predicted',
+}
+TAIL_ITEMS = {f'{prefix}.item': name for prefix, name in TAIL_ARRAYS.items()}
+TAIL_CLOSES = {f'{prefix}.close': name for prefix, name in TAIL_ITEMS.items()}
+
+# Files at least this large are streamed with ijson rather than decoded whole;
+# below it a full orjson/json decode is faster than ijson's per-token events
+STREAM_MIN_BYTES = 8 * 1024 * 1024
+
+def _tail_closes(path):
+    """Return (last historical close, last predicted close), or None if either list is empty"""
+    if ijson is None or os.path.getsize(path) < STREAM_MIN_BYTES:
+        chart_data = _load(path).get('chart_data', {})
+        predicted = chart_data.get('predicted_candlesticks')
+        historical = chart_data.get('historical_candlesticks', [])
+        if not predicted or not historical:
+            return None
+        return historical[-1].get('close', 0), predicted[-1].get('close', 0)
+
+    # Stream the tokens, keeping only the close of the latest candle in each
+    # array, and stop once both arrays have ended
+    last = {}
+    remaining = len(TAIL_ARRAYS)
+    with open(path, 'rb') as f:
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if prefix in TAIL_CLOSES:
+                last[TAIL_CLOSES[prefix]] = value
+            elif event == 'start_map' and prefix in TAIL_ITEMS:
+                last[TAIL_ITEMS[prefix]] = 0
+            elif event == 'end_array' and prefix in TAIL_ARRAYS:
+                remaining -= 1
+                if not remaining:
+                    break
+
+    if 'historical' not in last or 'predicted' not in last:
+        return None
+    return last['historical'], last['predicted']
+
+def _analyze_one(filepath):
+    """Return (pct_change, error) for one file; pct_change is None if it has no usable prices"""
+    try:
+        closes = _tail_closes(filepath)
+
+        # Check we have both historical and predicted data
+        if closes is not None:
+            # Get last historical price and last predicted price
+            last_historical_price, last_predicted_price = closes
+
+            if last_historical_price > 0 and last_predicted_price > 0:
+                # Calculate percentage change
+                pct_change = ((last_predicted_price - last_historical_price) / last_historical_price) * 100
+                return pct_change, None
+    except Exception as e:
+        return None, str(e)
+
+    return None, None
+
 def analyze_predictions():
-    # Get all prediction files
-    prediction_files = glob.glob('data/*_ohlcv_prediction.json')
+    # Count the prediction files and reservoir-sample up to SAMPLE_SIZE of
+    # them in one directory pass; the paths seen are kept only as a set, to
+    # prune cache entries of files that are gone
+    total_files = 0
+    sample_files = []
+    present = set()
+    with os.scandir('data') as entries:
+        for e in entries:
+            if not e.name.endswith('_ohlcv_prediction.json'):
+                continue
+            total_files += 1
+            present.add(e.path)
+            if len(sample_files) < SAMPLE_SIZE:
+                sample_files.append(e.path)
+            else:
+                j = random.randrange(total_files)
+                if j < SAMPLE_SIZE:
+                    sample_files[j] = e.path
 
-    total_files = len(prediction_files)
-    bullish_count = 0
-    bearish_count = 0
-    neutral_count = 0
-    price_changes = []
-    valid_predictions = 0
+    sample_size = len(sample_files)
     failed_files = []
 
-    # Sample analysis - analyze up to 500 files for statistics
-    sample_size = min(500, total_files)
-    sample_files = np.random.choice(prediction_files, sample_size, replace=False) if total_files > 0 else []
-
+    # Reuse results for files whose mtime and size match the cache, and
+    # forget files that have been deleted or renamed
+    cache = _load_cache(STATS_CACHE)
+    pruned = len(cache)
+    cache = {path: entry for path, entry in cache.items() if path in present}
+    pruned -= len(cache)
+    results = {}
+    stale = []
     for filepath in sample_files:
         try:
-            with open(filepath, 'r') as f:
-                data = json.load(f)
-
-            # Check if we have predicted data
-            if 'chart_data' in data and 'predicted_candlesticks' in data['chart_data']:
-                predicted = data['chart_data']['predicted_candlesticks']
-                historical = data['chart_data'].get('historical_candlesticks', [])
-
-                if predicted and len(predicted) > 0 and historical and len(historical) > 0:
-                    # Get last historical price and last predicted price
-                    last_historical_price = historical[-1].get('close', 0)
-                    last_predicted_price = predicted[-1].get('close', 0)
-
-                    if last_historical_price > 0 and last_predicted_price > 0:
-                        # Calculate percentage change
-                        pct_change = ((last_predicted_price - last_historical_price) / last_historical_price) * 100
-                        price_changes.append(pct_change)
-                        valid_predictions += 1
-
-                        # Categorize direction
-                        if pct_change > 1.0:
-                            bullish_count += 1
-                        elif pct_change < -1.0:
-                            bearish_count += 1
-                        else:
-                            neutral_count += 1
-        except Exception as e:
-            failed_files.append((filepath, str(e)))
-
-    # Scale up the sample statistics to the full dataset
+            st = os.stat(filepath)
+        except OSError as e:
+            results[filepath] = (None, str(e))
+            continue
+        key = [st.st_mtime_ns, st.st_size]
+        entry = cache.get(filepath)
+        if entry is not None and entry[:2] == key:
+            results[filepath] = (entry[2], None)
+        else:
+            stale.append((filepath, key))
+
+    # Files are independent, so parse them across cores and aggregate here
+    if stale:
+        with ProcessPoolExecutor() as executor:
+            parsed = executor.map(_analyze_one, [filepath for filepath, _ in stale], chunksize=16)
+            for (filepath, key), (pct_change, error) in zip(stale, parsed):
+                results[filepath] = (pct_change, error)
+                if error is None:
+                    cache[filepath] = key + [pct_change]
+    if stale or pruned:
+        _save_cache(cache, STATS_CACHE)
+
+    price_changes = []
+    for filepath in sample_files:
+        pct_change, error = results[filepath]
+        if error is not None:
+            failed_files.append((filepath, error))
+        elif pct_change is not None:
+            price_changes.append(pct_change)
+
+    # Categorize direction and summarize movement over one array
+    pc = np.asarray(price_changes, dtype=np.float64)
+    abs_pc = np.abs(pc)
+    valid_predictions = pc.size
+    bullish_count = int((pc > 1.0).sum())
+    bearish_count = int((pc < -1.0).sum())
+    neutral_count = valid_predictions - bullish_count - bearish_count
+
+    # Scale up the sample statistics to the full dataset; files in the sample
+    # without a usable prediction stay out of every direction count
     if valid_predictions > 0:
-        scale_factor = total_files / valid_predictions
-        bullish_total = int(bullish_count * scale_factor)
-        bearish_total = int(bearish_count * scale_factor)
-        neutral_total = int(neutral_count * scale_factor)
+        counts = np.array([bullish_count, bearish_count, neutral_count])
+        scaled = (counts * (total_files / sample_size)).astype(int)
+        bullish_total, bearish_total, neutral_total = scaled.tolist()
     else:
         bullish_total = bearish_total = neutral_total = 0
 
     # Calculate average movement
-    avg_movement = np.mean(np.abs(price_changes)) if price_changes else 0
+    avg_movement = abs_pc.mean() if pc.size else 0
 
     # Generate summary
     summary = {
@@ -73,9 +203,9 @@ def analyze_predictions():
         "estimated_bearish": bearish_total,
         "estimated_neutral": neutral_total,
         "avg_expected_movement_pct": round(avg_movement, 2),
-        "median_movement_pct": round(np.median(np.abs(price_changes)), 2) if price_changes else 0,
-        "max_gain_pct": round(max(price_changes), 2) if price_changes else 0,
-        "max_loss_pct": round(min(price_changes), 2) if price_changes else 0,
+        "median_movement_pct": round(np.median(abs_pc), 2) if pc.size else 0,
+        "max_gain_pct": round(pc.max(), 2) if pc.size else 0,
+        "max_loss_pct": round(pc.min(), 2) if pc.size else 0,
         "timestamp": datetime.now().isoformat(),
         "failed_files": len(failed_files)
     }
@@ -87,8 +217,7 @@ if __name__ == "__main__":
     stats = analyze_predictions()
 
     # Save to file
-    with open('data/prediction_stats.json', 'w') as f:
-        json.dump(stats, f, indent=2)
+    dump_json(stats, 'data/prediction_stats.json')
 
     # Print summary
     print(f"\n=== Prediction Summary Statistics ===")
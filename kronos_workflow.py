@@ -4,19 +4,29 @@ Kronos Predictions Workflow Orchestrator
 Main workflow script for transformers-predictions pipeline
 """
 
+from __future__ import annotations
+
 import sys
 import os
 import logging
 import json
 import argparse
+import multiprocessing
 import warnings
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional, Any
-import pandas as pd
-import numpy as np
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
-import torch
+from typing import Dict, List, Tuple, Optional, Any, TYPE_CHECKING
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# pandas, numpy, torch and the workflow modules are imported where they are
+# used, so argument parsing and --wrangler-login do not pay their import cost
+if TYPE_CHECKING:
+    import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # CRITICAL: Set PyTorch CUDA memory allocator to reduce fragmentation
 # This matches the kronos-backtest example scripts
@@ -26,16 +36,7 @@ os.environ['PYTORCH_CUDA_ALLOC_CONF'] = 'expandable_segments:True'
 sys.path.append(str(Path(__file__).parent.parent / 'src'))
 sys.path.append(str(Path(__file__).parent))
 
-# Import all workflow modules
-from data_module import DataComparator
-from batch_processing.batch_processor import BatchProcessor
-from batch_processing.kronos_integration import KronosModelWrapper
-from json_updater import JSONUpdater
-from analytics.statistics_calculator import StatisticsCalculator
-from analytics.homepage_generator import HomepageGenerator
-from export.csv_exporter import CSVExporter
-from deployment.deployment_manager import DeploymentManager
-from deployment.config import DeploymentConfig
+from prediction_io import dump_json
 
 # Configure logging
 logging.basicConfig(
@@ -51,6 +52,34 @@ logger = logging.getLogger(__name__)
 # Suppress warnings
 warnings.filterwarnings('ignore')
 
+# Per-process DataComparator used by prepare_batch_data workers
+_worker_comparator = None
+
+def _init_lookback_worker(finnhub_data_dir: str, predictions_dir: str):
+    """Build the DataComparator for one prepare_batch_data worker process"""
+    from data_module import DataComparator
+
+    global _worker_comparator
+    _worker_comparator = DataComparator(
+        finnhub_data_path=finnhub_data_dir,
+        predictions_path=predictions_dir
+    )
+
+def _prepare_lookback_data(ticker: str, end_date: datetime) -> Optional[pd.DataFrame]:
+    """Load lookback data for one ticker in a worker process"""
+    return _worker_comparator.prepare_lookback_data(ticker, end_date)
+
+def _final_median(paths: List[List[float]]) -> float:
+    """Median of the last value across equal-length Monte Carlo paths"""
+    import numpy as np
+
+    try:
+        finals = np.asarray(paths, dtype=np.float64)[:, -1]
+    except (ValueError, IndexError):
+        # Ragged paths - read each final value individually
+        finals = np.fromiter((p[-1] for p in paths), dtype=np.float64, count=len(paths))
+    return float(np.median(finals))
+
 class KronosWorkflow:
     """Main workflow orchestrator for Kronos predictions pipeline"""
 
@@ -76,7 +105,7 @@ class KronosWorkflow:
             'cloudflare_project': 'kronos-hoad',
             'git_repo': '/home/jarden/transformers-predictions',
             'csv_output': '/home/jarden/transformers-predictions/predictions_summary.csv',
-            'use_gpu': torch.cuda.is_available(),
+            'use_gpu': None,
             'max_batch_size': 100,
             'min_batch_size': 1
         }
@@ -84,10 +113,23 @@ class KronosWorkflow:
         if config:
             default_config.update(config)
 
+        # Only probe CUDA when the caller did not choose
+        if default_config['use_gpu'] is None:
+            import torch
+            default_config['use_gpu'] = torch.cuda.is_available()
+
         return default_config
 
     def setup_components(self):
         """Initialize all workflow components"""
+        from data_module import DataComparator
+        from batch_processing.batch_processor import BatchProcessor
+        from batch_processing.kronos_integration import KronosModelWrapper
+        from json_updater import JSONUpdater
+        from analytics.statistics_calculator import StatisticsCalculator
+        from analytics.homepage_generator import HomepageGenerator
+        from export.csv_exporter import CSVExporter
+
         logger.info("Setting up workflow components...")
 
         # Data comparison module
@@ -154,6 +196,9 @@ class KronosWorkflow:
             logger.info(f"Using Wrangler CLI for deployment to project: {self.config.get('cloudflare_project')}")
         elif os.getenv('CLOUDFLARE_API_TOKEN'):
             # Fallback to API token method if explicitly disabled Wrangler
+            from deployment.deployment_manager import DeploymentManager
+            from deployment.config import DeploymentConfig
+
             deployment_config = DeploymentConfig(
                 cloudflare_api_token=os.getenv('CLOUDFLARE_API_TOKEN'),
                 cloudflare_account_id=os.getenv('CLOUDFLARE_ACCOUNT_ID'),
@@ -203,12 +248,15 @@ class KronosWorkflow:
         tickers = self.data_comparator.load_ticker_list()
         logger.info(f"Loaded {len(tickers)} tickers")
 
-        # Filter to tickers with available data
-        available_tickers = []
-        for ticker in tickers:
-            data_file = Path(self.config['finnhub_data_dir']) / f"{ticker}_1D.parquet"
-            if data_file.exists():
-                available_tickers.append(ticker)
+        # Filter to tickers with available data, from one directory listing
+        suffix = "_1D.parquet"
+        try:
+            with os.scandir(self.config['finnhub_data_dir']) as entries:
+                available = {entry.name[:-len(suffix)] for entry in entries
+                             if entry.name.endswith(suffix)}
+        except FileNotFoundError:
+            available = set()
+        available_tickers = [ticker for ticker in tickers if ticker in available]
 
         logger.info(f"Found data for {len(available_tickers)} tickers")
         return available_tickers
@@ -221,19 +269,26 @@ class KronosWorkflow:
         batch_data = {}
         failed_tickers = []
 
-        with ThreadPoolExecutor(max_workers=4) as executor:
+        # Parquet decoding is CPU-bound, so load in worker processes; each
+        # builds its own DataComparator rather than pickling ours. Workers are
+        # spawned, not forked: by now this process has loaded torch, the model
+        # and possibly CUDA, which are not safe to fork
+        with ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_lookback_worker,
+            initargs=(self.config['finnhub_data_dir'], self.config['predictions_dir'])
+        ) as executor:
             futures = {
-                executor.submit(
-                    self.data_comparator.prepare_lookback_data,
-                    ticker, end_date
-                ): ticker
+                executor.submit(_prepare_lookback_data, ticker, end_date): ticker
                 for ticker in tickers
             }
 
-            for future in futures:
+            # Handle loads as they finish so one slow ticker does not hold up the rest
+            for future in as_completed(futures):
                 ticker = futures[future]
                 try:
-                    data = future.result(timeout=10)
+                    data = future.result()
                     if data is not None and not data.empty:
                         batch_data[ticker] = data
                     else:
@@ -305,6 +360,9 @@ class KronosWorkflow:
                           input_data: pd.DataFrame,
                           raw_prediction) -> Dict:
         """Format prediction for JSON and CSV export"""
+        import numpy as np
+        import pandas as pd
+
         input_start = pd.to_datetime(input_data.index[0])
         input_end = pd.to_datetime(input_data.index[-1])
 
@@ -555,7 +613,7 @@ class KronosWorkflow:
         elif isinstance(raw_prediction, dict):
             # It's a dictionary with pre-computed data
             predictions_data = raw_prediction.get('predictions', [])
-            median_close = float(np.median([p[-1] for p in predictions_data])) if predictions_data else float(input_data['close'].iloc[-1])
+            median_close = _final_median(predictions_data) if predictions_data else float(input_data['close'].iloc[-1])
             monte_carlo_paths = raw_prediction.get('monte_carlo_paths', [])
             predicted_candlesticks = raw_prediction.get('predicted_candlesticks', [])
             prediction_percentiles = raw_prediction.get('prediction_percentiles', {})
@@ -606,49 +664,74 @@ class KronosWorkflow:
 
     def _format_candlesticks(self, data: pd.DataFrame) -> List[Dict]:
         """Format OHLCV data as candlesticks with proper date handling"""
-        candlesticks = []
-        for idx, row in data.iterrows():
-            # Handle both datetime and integer indices
-            if isinstance(idx, (int, np.integer)):
-                # Integer index - this shouldn't happen with proper yfinance data
-                # Try to use the row's index position to get date from data
-                try:
-                    # Attempt to get date from the DataFrame if it has a datetime index elsewhere
-                    date_str = str(idx)
-                except:
-                    date_str = '1970-01-01'
-            elif hasattr(idx, 'strftime'):
-                # DateTime index - this is the expected case
-                date_str = idx.strftime('%Y-%m-%d')
-            elif isinstance(idx, str):
-                # String index - try to parse it
-                try:
-                    parsed_date = pd.to_datetime(idx)
-                    date_str = parsed_date.strftime('%Y-%m-%d')
-                except:
-                    date_str = idx
-            else:
-                # Fallback to string representation
-                date_str = str(idx)
+        import numpy as np
+        import pandas as pd
+
+        # DateTime index - this is the expected case, formatted in one call
+        if isinstance(data.index, pd.DatetimeIndex):
+            dates = data.index.strftime('%Y-%m-%d').tolist()
+        else:
+            dates = [self._format_date(idx) for idx in data.index]
+
+        # Pull each column out once instead of boxing every row as a Series
+        opens, highs, lows, closes = (
+            data[column].to_numpy(dtype=np.float64).tolist()
+            for column in ('open', 'high', 'low', 'close')
+        )
+        if 'volume' in data:
+            volumes = data['volume'].to_numpy(dtype=np.float64).tolist()
+        else:
+            volumes = [0.0] * len(data)
 
-            candlesticks.append({
+        return [
+            {
                 'date': date_str,
-                'open': float(row['open']),
-                'high': float(row['high']),
-                'low': float(row['low']),
-                'close': float(row['close']),
-                'volume': float(row.get('volume', 0))
-            })
-        return candlesticks
+                'open': open_,
+                'high': high,
+                'low': low,
+                'close': close,
+                'volume': volume
+            }
+            for date_str, open_, high, low, close, volume
+            in zip(dates, opens, highs, lows, closes, volumes)
+        ]
+
+    @staticmethod
+    def _format_date(idx) -> str:
+        """Format a single non-DatetimeIndex label as a date string"""
+        import numpy as np
+        import pandas as pd
+
+        # Handle both datetime and integer indices
+        if isinstance(idx, (int, np.integer)):
+            # Integer index - this shouldn't happen with proper yfinance data
+            return str(idx)
+        elif hasattr(idx, 'strftime'):
+            return idx.strftime('%Y-%m-%d')
+        elif isinstance(idx, str):
+            # String index - try to parse it
+            try:
+                parsed_date = pd.to_datetime(idx)
+                return parsed_date.strftime('%Y-%m-%d')
+            except:
+                return idx
+        else:
+            # Fallback to string representation
+            return str(idx)
 
     def update_predictions(self, predictions: Dict[str, Any]) -> Tuple[int, int]:
         """Update prediction JSON files"""
         logger.info("Updating prediction JSON files...")
 
+        # One updater, one call: JSONUpdater is not known to confine its writes
+        # to per-ticker files, so its updates are not run concurrently
         successful, failed, errors = self.json_updater.batch_update_predictions(
             predictions
         )
 
+        for error in errors:
+            logger.error(f"Failed to update prediction: {error}")
+
         logger.info(f"Updated {successful} prediction files")
 
         if failed > 0:
@@ -678,8 +761,7 @@ class KronosWorkflow:
 
         # Save to file
         stats_file = Path(self.config['predictions_dir']) / 'statistics' / 'summary.json'
-        with open(stats_file, 'w') as f:
-            json.dump(homepage_data, f, indent=2)
+        dump_json(homepage_data, stats_file, non_str_keys=True)
 
         logger.info(f"Updated homepage statistics: {stats_file}")
 
@@ -687,11 +769,8 @@ class KronosWorkflow:
         """Export predictions to CSV"""
         logger.info("Exporting predictions to CSV...")
 
-        # Prepare CSV data
-        csv_data = []
-        for ticker, pred in predictions.items():
-            summary = pred.get('summary', {})
-            csv_data.append(summary)
+        # Column order and number formatting are CSVExporter's contract
+        csv_data = [pred.get('summary', {}) for pred in predictions.values()]
 
         # Export to CSV
         csv_file = self.config['csv_output']
@@ -874,8 +953,8 @@ def main():
     # Load configuration
     config = {}
     if args.config:
-        with open(args.config) as f:
-            config = json.load(f)
+        with open(args.config, 'rb') as f:
+            config = orjson.loads(f.read()) if orjson is not None else json.load(f)
 
     # Override with command line args
     if args.gpu:
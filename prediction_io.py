@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+File helpers shared by the scripts that read and write the prediction data
+"""
+
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PREDICTION_SUFFIX = '_ohlcv_prediction.json'
+
+def list_prediction_files(data_dir):
+    """Return (ticker, path) for each OHLCV prediction file, in one scandir pass"""
+    with os.scandir(data_dir) as it:
+        return [(e.name[:-len(PREDICTION_SUFFIX)], e.path) for e in it
+                if e.name.endswith(PREDICTION_SUFFIX) and e.is_file()]
+
+def dump_json(obj, path, non_str_keys=False):
+    """Write obj as indented JSON, using orjson when it is installed.
+
+    The document goes to a temporary file in one write and is renamed over
+    path, so readers never see a half-written file. non_str_keys lets orjson
+    write int and date keys as json does; it is off by default as it slows
+    every dict down.
+    """
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+        if non_str_keys:
+            option |= orjson.OPT_NON_STR_KEYS
+        payload = orjson.dumps(obj, option=option)
+    else:
+        payload = json.dumps(obj, indent=2).encode()
+    tmp = f"{os.fspath(path)}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp, path)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Regenerate available_tickers.json, the validation results and the homepage
+statistics from a single pass over the prediction files
+
+Each file is read and parsed once, and the parsed document feeds all three
+outputs instead of update_available_tickers.py, update_homepage_stats.py and
+validate_data_structure.py each walking the directory themselves. Results
+are cached per file in a sqlite database, so a rerun only parses the files
+whose mtime or size changed. The cache is dropped whenever the code that
+computes the results changes.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import sqlite3
+import multiprocessing
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+# The homepage, ticker and prediction file modules live in the repository root
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import update_homepage_stats
+import validate_data_structure
+from update_available_tickers import build_available_tickers
+from update_homepage_stats import BAD_FILE_ERRORS, summarize_prediction, tally_predictions, update_homepage
+from prediction_io import dump_json, list_prediction_files
+from validate_data_structure import DataStructureValidator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BASE_DIR = Path('/home/jarden/transformers-predictions')
+DATA_DIR = BASE_DIR / 'data'
+VALIDATION_OUTPUT = BASE_DIR / 'docs' / 'validation_results.json'
+RESULTS_CACHE = DATA_DIR / '.regenerate_cache.db'
+
+# Validator owned by each worker process
+_worker_validator = None
+
+def _init_worker(data_dir: str):
+    """Build the validator once per worker process"""
+    global _worker_validator
+    _worker_validator = DataStructureValidator(data_dir)
+
+def _process_one(item: Tuple[int, Tuple[str, str]]) -> Tuple[int, Tuple[Tuple[bool, List[str], List[str]], Optional[Any]]]:
+    """Parse one file and derive everything the outputs need from it.
+
+    Returns (index, ((is_valid, errors, warnings), homepage summary or None)).
+    """
+    i, (ticker, file_path) = item
+    data, errors = _worker_validator.read_document(file_path)
+    if errors:
+        return i, ((False, errors, []), None)
+
+    validation = _worker_validator.validate_document(data)
+    try:
+        summary = summarize_prediction(data)
+    except BAD_FILE_ERRORS:
+        summary = None
+    return i, (validation, summary)
+
+def _code_version() -> str:
+    """Hash of the modules that compute the cached results"""
+    digest = hashlib.blake2b(digest_size=8)
+    for module_file in (__file__, validate_data_structure.__file__, update_homepage_stats.__file__):
+        with open(module_file, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def _open_cache(path) -> sqlite3.Connection:
+    """Open the per-file results cache, emptying it if the code version changed"""
+    conn = sqlite3.connect(path)
+    version = _code_version()
+    with conn:
+        conn.execute('CREATE TABLE IF NOT EXISTS results ('
+                     'path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, result BLOB)')
+        conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != version:
+            conn.execute('DELETE FROM results')
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,))
+    return conn
+
+def _encode(result) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(result)
+    return json.dumps(result).encode()
+
+def _decode(blob: bytes):
+    if orjson is not None:
+        return orjson.loads(blob)
+    return json.loads(blob)
+
+def main():
+    """Run the fused pass and write all three outputs"""
+    files = list_prediction_files(DATA_DIR)
+    print(f"Processing {len(files)} prediction files...")
+
+    # Serve files whose (mtime_ns, size) match the cache; parse the rest
+    conn = _open_cache(RESULTS_CACHE)
+    cached = {path: (mtime_ns, size, blob)
+              for path, mtime_ns, size, blob in conn.execute('SELECT * FROM results')}
+    results = [None] * len(files)
+    keys = [None] * len(files)
+    stale = []
+    for i, (_, path) in enumerate(files):
+        try:
+            st = os.stat(path)
+        except OSError:
+            # Left to the worker, which reports the read error
+            stale.append(i)
+            continue
+        keys[i] = (st.st_mtime_ns, st.st_size)
+        entry = cached.get(path)
+        if entry is not None and entry[:2] == keys[i]:
+            results[i] = _decode(entry[2])
+        else:
+            stale.append(i)
+    print(f"{len(files) - len(stale)} cached, {len(stale)} to parse")
+
+    # Results arrive in completion order and are put back in file order
+    if stale:
+        workers = max(1, (os.cpu_count() or 1) - 1)
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(str(DATA_DIR),)) as pool:
+            for done, (i, result) in enumerate(
+                    pool.imap_unordered(_process_one, ((i, files[i]) for i in stale), chunksize=64), 1):
+                results[i] = result
+                if done % 1000 == 0:
+                    print(f"Progress: {done}/{len(stale)} files processed")
+
+    # Store the new results and forget files that are gone
+    with conn:
+        conn.executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+                         [(files[i][1], *keys[i], _encode(results[i])) for i in stale if keys[i] is not None])
+        current = {path for _, path in files}
+        conn.executemany('DELETE FROM results WHERE path = ?',
+                         [(path,) for path in cached if path not in current])
+    conn.close()
+
+    # Available tickers
+    tickers = [ticker for ticker, _ in files]
+    dump_json(build_available_tickers(tickers), DATA_DIR / 'available_tickers.json')
+    print(f"Updated available_tickers.json with {len(tickers)} tickers")
+
+    # Validation results
+    validator = DataStructureValidator(str(DATA_DIR))
+    validator.validation_results['total_files'] = len(files)
+    validator.record_results([(ticker, *validation)
+                              for (ticker, _), (validation, _) in zip(files, results)])
+    print(validator.generate_report())
+    dump_json(validator.validation_results, VALIDATION_OUTPUT)
+
+    # Homepage statistics
+    update_homepage(tally_predictions(summary for _, summary in results))
+
+if __name__ == "__main__":
+    main()
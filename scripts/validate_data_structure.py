@@ -7,8 +7,70 @@ Validates JSON prediction files for schema compliance and web app readiness
 import json
 import os
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, List, Any, Tuple
-import glob
+import multiprocessing
+import sys
+from operator import itemgetter
+from pathlib import Path
+
+import numpy as np
+
+# The shared prediction file helpers live in the repository root
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from prediction_io import dump_json, list_prediction_files
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+@lru_cache(maxsize=65536)
+def _is_valid_date(value) -> bool:
+    """Whether value parses as %Y-%m-%d; cached since files share trading days."""
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        return False
+    return True
+
+CANDLE_FIELDS = ('date', 'open', 'high', 'low', 'close', 'volume')
+_candle_fields = itemgetter(*CANDLE_FIELDS)
+
+def _candles_all_valid(candlesticks) -> bool:
+    """True when no candle would get an error from validate_candlestick_data.
+
+    Field presence is checked by itemgetter over the whole list, OHLC
+    ordering in one NumPy pass and dates through the cache, so a clean list
+    costs no per-candle Python loop. False means the loop has to run to
+    report which candles are wrong.
+    """
+    try:
+        rows = list(map(_candle_fields, candlesticks))
+        if not rows:
+            return True
+        dates, o, h, l, c, _ = zip(*rows)
+        if not all(map(_is_valid_date, dates)):
+            return False
+        # No dtype coercion: strings or None must fall through to the loop
+        prices = np.array((o, h, l, c))
+        if prices.dtype.kind not in 'biuf':
+            return False
+        o, h, l, c = prices
+        return bool(((l <= o) & (o <= h) & (l <= c) & (c <= h)).all())
+    except (KeyError, TypeError, ValueError):
+        return False
+
+def _load(path):
+    """Load a JSON file, using orjson when it is installed"""
+    with open(path, 'rb') as f:
+        if orjson is not None:
+            return orjson.loads(f.read())
+        return json.load(f)
+
+# Messages kept per kind in validation_results; the counts cover the rest
+SAMPLE_LIMIT = 1000
 
 class DataStructureValidator:
     def __init__(self, data_dir: str):
@@ -19,6 +81,8 @@ class DataStructureValidator:
             'invalid_files': 0,
             'errors': [],
             'warnings': [],
+            'error_count': 0,
+            'warning_count': 0,
             'schema_compliance': True,
             'web_app_ready': True
         }
@@ -51,6 +115,8 @@ class DataStructureValidator:
         """Validate candlestick data structure"""
         errors = []
         required_fields = ['date', 'open', 'high', 'low', 'close', 'volume']
+        if _candles_all_valid(candlesticks):
+            return errors
 
         for i, candle in enumerate(candlesticks):
             for field in required_fields:
@@ -65,9 +131,7 @@ class DataStructureValidator:
 
             # Validate date format
             if 'date' in candle:
-                try:
-                    datetime.strptime(candle['date'], '%Y-%m-%d')
-                except ValueError:
+                if not _is_valid_date(candle['date']):
                     errors.append(f"Invalid date format in {data_type}[{i}]: {candle['date']}")
 
         return errors
@@ -112,20 +176,47 @@ class DataStructureValidator:
 
         return errors
 
-    def validate_file(self, file_path: str) -> Tuple[bool, List[str], List[str]]:
-        """Validate a single prediction file"""
-        errors = []
-        warnings = []
+    def validate_data_section(self, data_section: Dict, errors: List[str], warnings: List[str]):
+        """Validate the candlestick lists of the data section"""
+        if 'historical_candlesticks' not in data_section:
+            errors.append("Missing data.historical_candlesticks")
+        else:
+            errors.extend(self.validate_candlestick_data(
+                data_section['historical_candlesticks'], 'historical_candlesticks'
+            ))
+
+        if 'predicted_candlesticks' not in data_section:
+            errors.append("Missing data.predicted_candlesticks")
+        else:
+            # Empty predictions are acceptable (model failures)
+            if len(data_section['predicted_candlesticks']) == 0:
+                warnings.append("Empty predicted_candlesticks (model prediction failure)")
+            else:
+                errors.extend(self.validate_candlestick_data(
+                    data_section['predicted_candlesticks'], 'predicted_candlesticks'
+                ))
 
+    def read_document(self, file_path: str) -> Tuple[Any, List[str]]:
+        """Parse a prediction file; returns (data, errors), errors only when it could not be read"""
         try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
+            return _load(file_path), []
         except json.JSONDecodeError as e:
-            errors.append(f"Invalid JSON: {e}")
-            return False, errors, warnings
+            # orjson.JSONDecodeError subclasses json.JSONDecodeError
+            return None, [f"Invalid JSON: {e}"]
         except Exception as e:
-            errors.append(f"File read error: {e}")
-            return False, errors, warnings
+            return None, [f"File read error: {e}"]
+
+    def validate_file(self, file_path: str) -> Tuple[bool, List[str], List[str]]:
+        """Validate a single prediction file"""
+        data, errors = self.read_document(file_path)
+        if errors:
+            return False, errors, []
+        return self.validate_document(data)
+
+    def validate_document(self, data: Any) -> Tuple[bool, List[str], List[str]]:
+        """Validate an already parsed prediction document"""
+        errors = []
+        warnings = []
 
         # Validate top-level structure
         required_top_level = ['ticker_info', 'data', 'chart_data', 'summary_stats']
@@ -139,24 +230,7 @@ class DataStructureValidator:
 
         # Validate data section
         if 'data' in data:
-            data_section = data['data']
-            if 'historical_candlesticks' not in data_section:
-                errors.append("Missing data.historical_candlesticks")
-            else:
-                errors.extend(self.validate_candlestick_data(
-                    data_section['historical_candlesticks'], 'historical_candlesticks'
-                ))
-
-            if 'predicted_candlesticks' not in data_section:
-                errors.append("Missing data.predicted_candlesticks")
-            else:
-                # Empty predictions are acceptable (model failures)
-                if len(data_section['predicted_candlesticks']) == 0:
-                    warnings.append("Empty predicted_candlesticks (model prediction failure)")
-                else:
-                    errors.extend(self.validate_candlestick_data(
-                        data_section['predicted_candlesticks'], 'predicted_candlesticks'
-                    ))
+            self.validate_data_section(data['data'], errors, warnings)
 
         # Validate chart_data section
         if 'chart_data' in data:
@@ -172,8 +246,7 @@ class DataStructureValidator:
 
     def validate_all_files(self, sample_size: int = None) -> Dict:
         """Validate all prediction files in the data directory"""
-        pattern = os.path.join(self.data_dir, "*_ohlcv_prediction.json")
-        files = glob.glob(pattern)
+        files = list_prediction_files(self.data_dir)
 
         if sample_size:
             files = files[:sample_size]
@@ -182,25 +255,31 @@ class DataStructureValidator:
 
         print(f"Validating {len(files)} prediction files...")
 
-        for i, file_path in enumerate(files):
-            if i > 0 and i % 100 == 0:
-                print(f"Progress: {i}/{len(files)} files validated")
-
-            ticker = os.path.basename(file_path).replace('_ohlcv_prediction.json', '')
-            is_valid, errors, warnings = self.validate_file(file_path)
-
+        # Files validate independently, so fan out across cores; results
+        # arrive in completion order and are put back in file order
+        results = [None] * len(files)
+        workers = max(1, (os.cpu_count() or 1) - 1)
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(self.data_dir,)) as pool:
+            for done, (i, result) in enumerate(
+                    pool.imap_unordered(_validate_one, enumerate(files), chunksize=64), 1):
+                results[i] = result
+                if done % 100 == 0:
+                    print(f"Progress: {done}/{len(files)} files validated")
+
+        return self.record_results(results)
+
+    def record_results(self, results: List[Tuple[str, bool, List[str], List[str]]]) -> Dict:
+        """Fold (ticker, is_valid, errors, warnings) per file into validation_results"""
+        for ticker, is_valid, errors, warnings in results:
             if is_valid:
                 self.validation_results['valid_files'] += 1
             else:
                 self.validation_results['invalid_files'] += 1
                 self.validation_results['schema_compliance'] = False
 
-            # Store errors and warnings with file context
-            for error in errors:
-                self.validation_results['errors'].append(f"{ticker}: {error}")
-
-            for warning in warnings:
-                self.validation_results['warnings'].append(f"{ticker}: {warning}")
+            # Store errors and warnings with file context, up to SAMPLE_LIMIT each
+            self._record(ticker, errors, 'errors', 'error_count')
+            self._record(ticker, warnings, 'warnings', 'warning_count')
 
         # Determine web app readiness
         if self.validation_results['invalid_files'] > 0:
@@ -208,6 +287,13 @@ class DataStructureValidator:
 
         return self.validation_results
 
+    def _record(self, ticker: str, messages: List[str], sample_key: str, count_key: str):
+        """Count messages and keep the first SAMPLE_LIMIT of them, prefixed with the ticker"""
+        self.validation_results[count_key] += len(messages)
+        sample = self.validation_results[sample_key]
+        for message in messages[:SAMPLE_LIMIT - len(sample)]:
+            sample.append(f"{ticker}: {message}")
+
     def generate_report(self) -> str:
         """Generate a validation report"""
         results = self.validation_results
@@ -229,21 +315,35 @@ Validation Rate: {(results['valid_files'] / results['total_files'] * 100):.1f}%
 """
 
         if results['errors']:
-            report += f"\nErrors Found ({len(results['errors'])}):\n"
+            report += f"\nErrors Found ({results['error_count']}):\n"
             for error in results['errors'][:10]:  # Show first 10 errors
                 report += f"- {error}\n"
-            if len(results['errors']) > 10:
-                report += f"... and {len(results['errors']) - 10} more errors\n"
+            if results['error_count'] > 10:
+                report += f"... and {results['error_count'] - 10} more errors\n"
 
         if results['warnings']:
-            report += f"\nWarnings ({len(results['warnings'])}):\n"
+            report += f"\nWarnings ({results['warning_count']}):\n"
             for warning in results['warnings'][:10]:  # Show first 10 warnings
                 report += f"- {warning}\n"
-            if len(results['warnings']) > 10:
-                report += f"... and {len(results['warnings']) - 10} more warnings\n"
+            if results['warning_count'] > 10:
+                report += f"... and {results['warning_count'] - 10} more warnings\n"
 
         return report
 
+# Validator owned by each validate_all_files worker process
+_worker_validator = None
+
+def _init_worker(data_dir: str):
+    """Build the validator once per worker process"""
+    global _worker_validator
+    _worker_validator = DataStructureValidator(data_dir)
+
+def _validate_one(item: Tuple[int, Tuple[str, str]]) -> Tuple[int, Tuple[str, bool, List[str], List[str]]]:
+    """Validate one (index, (ticker, path)) pair; returns (index, (ticker, ok, errors, warnings))"""
+    i, (ticker, file_path) = item
+    is_valid, errors, warnings = _worker_validator.validate_file(file_path)
+    return i, (ticker, is_valid, errors, warnings)
+
 def main():
     """Main validation function"""
     data_dir = "/home/jarden/transformers-predictions/data"
@@ -258,8 +358,7 @@ def main():
     print(report)
 
     # Save detailed results to file
-    with open("/home/jarden/transformers-predictions/docs/validation_results.json", "w") as f:
-        json.dump(results, f, indent=2)
+    dump_json(results, "/home/jarden/transformers-predictions/docs/validation_results.json")
 
     print("Detailed results saved to: docs/validation_results.json")
 
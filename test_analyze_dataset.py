@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Tests for analyze_dataset.py: the ijson summary parser must give the same
+metrics as loading the whole document, and the metrics cache must only
+serve files that did not change
+"""
+
+import json
+import os
+import shelve
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent))
+
+import analyze_dataset
+
+DATA_DIR = Path(__file__).parent / 'data'
+
+def _metrics(mape):
+    return {'mape': mape, 'accuracy_5pct': 80.0, 'accuracy_10pct': 95.0}
+
+def _candles(n):
+    return [{'date': f'2025-10-{i % 28 + 1:02d}', 'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5,
+             'volume': 100} for i in range(n)]
+
+def _full_document():
+    return {
+        'chart_data': {'historical_candlesticks': _candles(200), 'predicted_candlesticks': _candles(5)},
+        'data': {
+            'historical_candlesticks': _candles(200),
+            'prediction_metrics': {key: _metrics(i + 1.5) for i, key in enumerate(analyze_dataset.METRIC_SPECS)},
+            'model_info': {'model_type': 'kronos', 'monte_carlo_simulations': 10},
+            'metadata': {'prediction_days': 5, 'lookback_days': 120},
+        },
+        'summary_stats': {'overall_score': 87.5, 'prediction_quality': 'GOOD'},
+    }
+
+def _partial_document():
+    doc = _full_document()
+    # Missing sections: the stream runs to the end without finding them
+    del doc['data']['prediction_metrics']
+    del doc['summary_stats']
+    return doc
+
+def _parse_both_ways(path, monkeypatch):
+    """parse_ticker through the full load and through the forced ijson stream"""
+    whole = analyze_dataset.parse_ticker(path)
+    with monkeypatch.context() as m:
+        m.setattr(analyze_dataset, 'STREAM_MIN_BYTES', 0)
+        streamed = analyze_dataset.parse_ticker(path)
+    return whole, streamed
+
+@pytest.mark.parametrize('make_doc', [_full_document, _partial_document])
+def test_streamed_summary_matches_full_load(tmp_path, monkeypatch, make_doc):
+    pytest.importorskip('ijson')
+    path = tmp_path / 'AAA_ohlcv_prediction.json'
+    path.write_text(json.dumps(make_doc()))
+
+    whole, streamed = _parse_both_ways(str(path), monkeypatch)
+    assert whole is not None
+    assert streamed == whole
+
+def test_streamed_summary_keeps_only_the_summary_sections(tmp_path, monkeypatch):
+    pytest.importorskip('ijson')
+    path = tmp_path / 'AAA_ohlcv_prediction.json'
+    doc = _full_document()
+    path.write_text(json.dumps(doc))
+
+    monkeypatch.setattr(analyze_dataset, 'STREAM_MIN_BYTES', 0)
+    summary = analyze_dataset._load_summary(str(path))
+    assert summary == {
+        'summary_stats': doc['summary_stats'],
+        'data': {key: doc['data'][key] for key in ('prediction_metrics', 'model_info', 'metadata')},
+    }
+
+def test_streamed_summary_matches_full_load_on_repository_files(monkeypatch):
+    pytest.importorskip('ijson')
+    paths = sorted(DATA_DIR.glob('*_ohlcv_prediction.json'))[:50] if DATA_DIR.exists() else []
+    if not paths:
+        pytest.skip('no prediction files')
+
+    for path in paths:
+        whole, streamed = _parse_both_ways(str(path), monkeypatch)
+        assert streamed == whole, path
+
+def _ticker_file(path, score):
+    doc = _full_document()
+    doc['summary_stats']['overall_score'] = score
+    path.write_text(json.dumps(doc))
+
+@pytest.fixture
+def ticker_dir(tmp_path):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    for i, ticker in enumerate(['AAA', 'BBB', 'CCC']):
+        _ticker_file(data_dir / f'{ticker}_ohlcv_prediction.json', score=80 + i)
+    return data_dir
+
+def _entries(data_dir):
+    with os.scandir(data_dir) as it:
+        return sorted((e for e in it if e.name.endswith('.json')), key=lambda e: e.name)
+
+def test_parse_all_serves_unchanged_files_from_cache(ticker_dir, tmp_path, capsys):
+    cache_path = str(tmp_path / 'cache')
+
+    first = analyze_dataset._parse_all(_entries(ticker_dir), cache_path)
+    assert 'Parsed 3 changed files, 0 from cache' in capsys.readouterr().out
+
+    second = analyze_dataset._parse_all(_entries(ticker_dir), cache_path)
+    assert 'Parsed 0 changed files, 3 from cache' in capsys.readouterr().out
+    assert second == first
+    assert [m.score for m in second] == [80, 81, 82]
+
+def test_parse_all_reparses_a_changed_file(ticker_dir, tmp_path, capsys):
+    cache_path = str(tmp_path / 'cache')
+    analyze_dataset._parse_all(_entries(ticker_dir), cache_path)
+
+    _ticker_file(ticker_dir / 'BBB_ohlcv_prediction.json', score=95.5)
+    results = analyze_dataset._parse_all(_entries(ticker_dir), cache_path)
+
+    assert 'Parsed 1 changed files, 2 from cache' in capsys.readouterr().out
+    assert [m.score for m in results] == [80, 95.5, 82]
+
+def test_parse_all_forgets_deleted_files(ticker_dir, tmp_path):
+    cache_path = str(tmp_path / 'cache')
+    analyze_dataset._parse_all(_entries(ticker_dir), cache_path)
+
+    (ticker_dir / 'CCC_ohlcv_prediction.json').unlink()
+    analyze_dataset._parse_all(_entries(ticker_dir), cache_path)
+
+    with shelve.open(cache_path) as cache:
+        assert sorted(os.path.basename(p) for p in cache if p != analyze_dataset.CACHE_VERSION_KEY) == [
+            'AAA_ohlcv_prediction.json', 'BBB_ohlcv_prediction.json']
+
+def test_parse_all_drops_cache_from_other_code_version(ticker_dir, tmp_path, monkeypatch, capsys):
+    cache_path = str(tmp_path / 'cache')
+    entries = _entries(ticker_dir)
+    analyze_dataset._parse_all(entries, cache_path)
+
+    # A stat-matching entry that only the version check can reject
+    st = entries[0].stat()
+    with shelve.open(cache_path) as cache:
+        cache[entries[0].path] = (st.st_mtime_ns, st.st_size, ('stale',))
+
+    monkeypatch.setattr(analyze_dataset, 'CACHE_VERSION', 'other')
+    results = analyze_dataset._parse_all(entries, cache_path)
+
+    assert 'Parsed 3 changed files, 0 from cache' in capsys.readouterr().out
+    assert results[0].score == 80
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Tests for generate_stats.py: the ijson tail reader must find the same closes
+as loading the whole document, and the results cache must only serve files
+that did not change
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent))
+
+import generate_stats
+
+DATA_DIR = Path(__file__).parent / 'data'
+
+def _candles(closes):
+    return [{'date': '2025-10-03', 'open': 1.0, 'high': 1.0, 'low': 1.0, 'close': close, 'volume': 1}
+            for close in closes]
+
+def _prediction_file(path, historical, predicted):
+    doc = {
+        'data': {'historical_candlesticks': _candles([999.0])},
+        'chart_data': {
+            'historical_candlesticks': _candles(historical),
+            'predicted_candlesticks': _candles(predicted),
+        },
+        'summary_stats': {'direction': 'Bullish'},
+    }
+    path.write_text(json.dumps(doc))
+
+def _tail_closes_both_ways(path, monkeypatch):
+    """_tail_closes through the full load and through the forced ijson stream"""
+    whole = generate_stats._tail_closes(path)
+    with monkeypatch.context() as m:
+        m.setattr(generate_stats, 'STREAM_MIN_BYTES', 0)
+        streamed = generate_stats._tail_closes(path)
+    return whole, streamed
+
+@pytest.mark.parametrize('historical, predicted, expected', [
+    ([100.0, 101.5], [102.0, 104.25], (101.5, 104.25)),
+    ([100.0], [], None),
+    ([], [102.0], None),
+])
+def test_streamed_tail_closes_match_full_load(tmp_path, monkeypatch, historical, predicted, expected):
+    pytest.importorskip('ijson')
+    path = tmp_path / 'AAA_ohlcv_prediction.json'
+    _prediction_file(path, historical, predicted)
+    assert _tail_closes_both_ways(str(path), monkeypatch) == (expected, expected)
+
+def test_streamed_tail_closes_match_full_load_on_repository_files(monkeypatch):
+    pytest.importorskip('ijson')
+    paths = sorted(DATA_DIR.glob('*_ohlcv_prediction.json'))[:50] if DATA_DIR.exists() else []
+    if not paths:
+        pytest.skip('no prediction files')
+
+    for path in paths:
+        whole, streamed = _tail_closes_both_ways(str(path), monkeypatch)
+        assert streamed == whole, path
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """A data/ directory of three predictions, 10% up each, as the working directory's"""
+    monkeypatch.chdir(tmp_path)
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    for ticker in ['AAA', 'BBB', 'CCC']:
+        _prediction_file(data_dir / f'{ticker}_ohlcv_prediction.json', [100.0], [110.0])
+    return data_dir
+
+def _cached_files():
+    return json.loads(Path(generate_stats.STATS_CACHE).read_text())['files']
+
+def _edit_cache(edit):
+    cache = json.loads(Path(generate_stats.STATS_CACHE).read_text())
+    edit(cache)
+    Path(generate_stats.STATS_CACHE).write_text(json.dumps(cache))
+
+def test_analyze_predictions_reuses_cached_price_changes(data_dir):
+    first = generate_stats.analyze_predictions()
+    assert first['valid_predictions_in_sample'] == 3
+    assert first['max_gain_pct'] == 10.0
+
+    # Stat-matching entries are served from the cache without re-reading the file
+    def bump(cache):
+        for entry in cache['files'].values():
+            entry[2] = 50.0
+    _edit_cache(bump)
+    assert generate_stats.analyze_predictions()['max_gain_pct'] == 50.0
+
+    # A rewritten file is parsed again
+    path = data_dir / 'AAA_ohlcv_prediction.json'
+    st = path.stat()
+    _prediction_file(path, [100.0], [130.0])
+    # Same size, so make sure the mtime moves even on coarse-grained filesystems
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert generate_stats.analyze_predictions()['max_gain_pct'] == 50.0
+    assert _cached_files()['data/AAA_ohlcv_prediction.json'][2] == 30.0
+
+def test_cache_from_other_code_version_is_ignored(data_dir):
+    generate_stats.analyze_predictions()
+
+    def stale(cache):
+        cache['version'] = 'other'
+        for entry in cache['files'].values():
+            entry[2] = 50.0
+    _edit_cache(stale)
+
+    assert generate_stats.analyze_predictions()['max_gain_pct'] == 10.0
+    assert json.loads(Path(generate_stats.STATS_CACHE).read_text())['version'] == generate_stats.CACHE_VERSION
+
+def test_cache_forgets_deleted_files(data_dir):
+    generate_stats.analyze_predictions()
+    os.replace(data_dir / 'CCC_ohlcv_prediction.json', data_dir / 'CCC_old.json')
+
+    assert generate_stats.analyze_predictions()['total_predictions'] == 2
+    assert sorted(_cached_files()) == ['data/AAA_ohlcv_prediction.json', 'data/BBB_ohlcv_prediction.json']
+
+def test_cache_is_written_atomically(data_dir, monkeypatch):
+    generate_stats.analyze_predictions()
+    before = Path(generate_stats.STATS_CACHE).read_bytes()
+
+    def crash(src, dst):
+        raise OSError('disk full')
+    monkeypatch.setattr(os, 'replace', crash)
+    _prediction_file(data_dir / 'DDD_ohlcv_prediction.json', [100.0], [90.0])
+    with pytest.raises(OSError):
+        generate_stats.analyze_predictions()
+
+    assert Path(generate_stats.STATS_CACHE).read_bytes() == before
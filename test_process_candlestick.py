@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Tests for data/process_candlestick.py
+"""
+
+import hashlib
+import json
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent / 'data'))
+
+import process_candlestick
+from process_candlestick import SHARD_DIR, Candles, CandlestickDataProcessor, TopK, in_processing_order, shard_bucket
+
+def test_topk_matches_sorting_the_latest_values():
+    rng = random.Random(0)
+    gainers, losers = TopK(k=5, largest=True), TopK(k=5, largest=False)
+    latest = {}
+    for _ in range(500):
+        ticker = f"T{rng.randrange(40)}"
+        value = rng.random()
+        latest[ticker] = value
+        gainers.upsert(ticker, value, ticker)
+        losers.upsert(ticker, value, ticker)
+
+        assert gainers.top() == sorted(latest, key=latest.get, reverse=True)[:5]
+        assert losers.top() == sorted(latest, key=latest.get)[:5]
+
+def test_topk_compacts_superseded_entries():
+    top = TopK(k=3)
+    for i in range(100):
+        top.upsert('A', i, i)
+        top.upsert('B', -i, -i)
+    assert top.top() == [99, -99]
+    assert len(top.heap) <= 2 * len(top.live) + 1
+
+def _candle(date, close, volume):
+    return {"date": date, "open": close, "high": close + 1, "low": close - 1, "close": close, "volume": volume}
+
+def test_candles_round_trip_keeps_values_and_volume_types():
+    records = [_candle("2025-10-02", 10.5, 1200), _candle("2025-10-03", 11.0, 1300)]
+    candles = Candles.from_records(records)
+    assert candles.volume.dtype.kind == 'i'
+    assert candles.to_records() == records
+    assert json.dumps(candles.to_records()) == json.dumps(records)
+
+def test_candles_keep_mixed_volumes_as_they_came():
+    records = [_candle("2025-10-02", 10.5, 1200), _candle("2025-10-03", 11.0, 1300.5)]
+    assert json.dumps(Candles.from_records(records).to_records()) == json.dumps(records)
+
+def test_candles_skip_incomplete_records():
+    good = _candle("2025-10-03", 11.0, 1300)
+    records = [
+        _candle("2025-10-01", 10.0, None),
+        {k: v for k, v in _candle("2025-10-02", 10.5, 1200).items() if k != "volume"},
+        dict(_candle("2025-10-02", 10.5, 1200), high="11.5"),
+        good,
+    ]
+    assert Candles.from_records(records).to_records() == [good]
+
+def test_timestamped_files_are_processed_last():
+    paths = ["d/B_prediction_20251003.json", "d/A_ohlcv_prediction.json",
+             "d/A_prediction_20251003.json", "d/B_ohlcv_prediction.json"]
+    assert in_processing_order(paths) == [
+        "d/A_ohlcv_prediction.json", "d/B_ohlcv_prediction.json",
+        "d/B_prediction_20251003.json", "d/A_prediction_20251003.json",
+    ]
+
+def _ohlcv_file(data_dir, ticker, closes):
+    candles = [_candle(f"2025-10-0{i + 1}", close, 1000) for i, close in enumerate(closes)]
+    doc = {"chart_data": {"historical_candlesticks": candles[:1], "actual_candlesticks": candles}}
+    path = data_dir / f"{ticker}_ohlcv_prediction.json"
+    path.write_text(json.dumps(doc))
+    return path
+
+@pytest.fixture
+def hooks(monkeypatch):
+    """Record hook commands instead of running npx"""
+    calls = []
+
+    class FakePopen:
+        def __init__(self, args, **kwargs):
+            calls.append(args)
+
+        def wait(self):
+            return 0
+
+    monkeypatch.setattr(process_candlestick.subprocess, "Popen", FakePopen)
+    return calls
+
+@pytest.fixture
+def processor(tmp_path, hooks):
+    return CandlestickDataProcessor(data_folder=str(tmp_path), hook_interval=60)
+
+def test_timestamped_file_wins_in_changed_file_scan(tmp_path, processor):
+    _ohlcv_file(tmp_path, "AAA", [10.0, 11.0])
+    (tmp_path / "AAA_prediction_20251003.json").write_text(json.dumps({
+        "ohlcv_data": [_candle("2025-10-03", 20.0, 5)], "market_data": {"latest_close": 20.0}}))
+
+    processor.process_new_files()
+    assert processor.candlestick_data["AAA"]["data_type"] == "timestamped"
+
+    # Unchanged files are neither rescanned nor picked up again from events
+    assert processor.scan_changed_files() == []
+    assert processor.filter_changed([str(tmp_path / "AAA_ohlcv_prediction.json")]) == []
+
+def test_dirty_shards_and_manifest(tmp_path, processor):
+    tickers = ["AAA", "ZZZ"]
+    assert shard_bucket("AAA") != shard_bucket("ZZZ")
+    paths = [_ohlcv_file(tmp_path, t, [10.0, 12.0]) for t in tickers]
+    processor.process_files([str(p) for p in paths])
+    processor.save_processed_data()
+
+    shard_dir = tmp_path / SHARD_DIR
+    manifest = json.loads((shard_dir / "manifest.json").read_text())
+    assert manifest["total_tickers"] == 2
+    for ticker in tickers:
+        name = f"{shard_bucket(ticker):02x}.json"
+        payload = (shard_dir / name).read_bytes()
+        assert manifest["shards"][name]["tickers"] == [ticker]
+        assert manifest["shards"][name]["hash"] == hashlib.blake2b(payload, digest_size=8).hexdigest()
+        assert json.loads(payload)[ticker]["latest_price"] == 12.0
+
+    # Only the shard of the updated ticker is rewritten
+    other = shard_dir / f"{shard_bucket('ZZZ'):02x}.json"
+    other.unlink()
+    _ohlcv_file(tmp_path, "AAA", [10.0, 15.0])
+    processor.process_files([str(tmp_path / "AAA_ohlcv_prediction.json")])
+    processor.save_processed_data()
+    assert not other.exists()
+    updated = json.loads((shard_dir / "manifest.json").read_text())
+    assert updated["shards"][f"{shard_bucket('ZZZ'):02x}.json"] == manifest["shards"][f"{shard_bucket('ZZZ'):02x}.json"]
+
+def test_hooks_run_at_most_once_per_interval(processor, hooks, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(process_candlestick.time, "monotonic", lambda: now[0])
+
+    processor.store_in_memory()
+    assert hooks == []  # nothing saved yet
+
+    processor.hooks_dirty = True
+    processor.store_in_memory()
+    assert len(hooks) == 2
+
+    # A save inside the interval is held back until it passes or is forced
+    processor.hooks_dirty = True
+    now[0] += 30
+    processor.store_in_memory()
+    assert len(hooks) == 2
+    now[0] += 31
+    processor.store_in_memory()
+    assert len(hooks) == 4
+
+    processor.hooks_dirty = True
+    processor.store_in_memory(force=True)
+    assert len(hooks) == 6
+    assert not processor.hooks_dirty
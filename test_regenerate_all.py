@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Tests for scripts/regenerate_all.py: the per-file results cache must start
+over when the code that produced it changes
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+
+import regenerate_all
+
+def test_regenerate_cache_keeps_rows_for_the_same_code(tmp_path):
+    path = tmp_path / 'cache.db'
+    conn = regenerate_all._open_cache(path)
+    with conn:
+        conn.execute("INSERT INTO results VALUES ('a.json', 1, 2, ?)", (regenerate_all._encode([1]),))
+    conn.close()
+
+    conn = regenerate_all._open_cache(path)
+    rows = conn.execute('SELECT path, result FROM results').fetchall()
+    conn.close()
+    assert [(p, regenerate_all._decode(blob)) for p, blob in rows] == [('a.json', [1])]
+
+def test_regenerate_cache_is_emptied_when_the_code_changes(tmp_path, monkeypatch):
+    path = tmp_path / 'cache.db'
+    conn = regenerate_all._open_cache(path)
+    with conn:
+        conn.execute("INSERT INTO results VALUES ('a.json', 1, 2, ?)", (regenerate_all._encode([1]),))
+    conn.close()
+
+    monkeypatch.setattr(regenerate_all, '_code_version', lambda: 'other')
+    conn = regenerate_all._open_cache(path)
+    count = conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+    version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+    conn.close()
+    assert (count, version) == (0, 'other')
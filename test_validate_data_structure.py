@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for scripts/validate_data_structure.py: the whole-list candle check must
+agree with the per-candle loop it lets validate_candlestick_data skip
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+
+import validate_data_structure
+from prediction_io import list_prediction_files
+from validate_data_structure import DataStructureValidator, _candles_all_valid, _load
+
+DATA_DIR = Path(__file__).parent / 'data'
+
+def _candle(date='2025-10-03', o=10.0, h=12.0, l=9.0, c=11.0, v=1000):
+    return {'date': date, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+
+CANDLE_LISTS = {
+    'empty': [],
+    'valid': [_candle(), _candle(date='2025-10-06', o=11.0, h=11.0, l=11.0, c=11.0)],
+    'missing_volume': [_candle(), {k: v for k, v in _candle().items() if k != 'volume'}],
+    'missing_close': [{k: v for k, v in _candle().items() if k != 'close'}],
+    'open_above_high': [_candle(o=13.0)],
+    'close_below_low': [_candle(c=8.5)],
+    'bad_date': [_candle(date='10/03/2025')],
+    'non_string_date': [_candle(date=20251003)],
+    'null_price': [_candle(o=None)],
+    'string_price': [_candle(h='12')],
+}
+
+def _loop_errors(monkeypatch, candles):
+    """Errors from the per-candle loop alone, with the whole-list check disabled"""
+    monkeypatch.setattr(validate_data_structure, '_candles_all_valid', lambda candles: False)
+    try:
+        return DataStructureValidator('.').validate_candlestick_data(candles, 'candles')
+    except TypeError:
+        # The loop cannot compare mixed types; that is a failure too
+        return ['TypeError']
+
+@pytest.mark.parametrize('name', sorted(CANDLE_LISTS))
+def test_fast_check_agrees_with_candle_loop(monkeypatch, name):
+    candles = CANDLE_LISTS[name]
+    assert _candles_all_valid(candles) == (not _loop_errors(monkeypatch, candles))
+
+def test_fast_check_agrees_on_repository_files(monkeypatch):
+    if not DATA_DIR.exists():
+        pytest.skip('no prediction files')
+    files = sorted(list_prediction_files(DATA_DIR))[:200]
+    if not files:
+        pytest.skip('no prediction files')
+
+    for _, path in files:
+        chart_data = _load(path).get('chart_data', {})
+        for key in ('historical_candlesticks', 'predicted_candlesticks'):
+            candles = chart_data.get(key, [])
+            assert _candles_all_valid(candles) == (not _loop_errors(monkeypatch, candles)), (path, key)
+            monkeypatch.undo()
+
+def _valid_document():
+    return {
+        'ticker_info': {'symbol': 'TEST', 'last_update': '2025-10-03', 'model_type': 'kronos',
+                        'lookback_days': 120, 'prediction_days': 5, 'monte_carlo_runs': 10},
+        'data': {'historical_candlesticks': [_candle()], 'predicted_candlesticks': [_candle()]},
+        'chart_data': {},
+        'summary_stats': {
+            'last_close': 11.0, 'predicted_close': 11.5, 'price_change': 0.5,
+            'price_change_percent': 4.5, 'direction': 'up', 'confidence': 0.8,
+            'volatility': 20.0, 'avg_volume': 1000,
+            'data_quality': {'completeness': 1.0, 'historical_days': 120, 'chart_ready': True},
+        },
+    }
+
+def test_valid_document_passes():
+    assert DataStructureValidator('.').validate_document(_valid_document()) == (True, [], [])
+
+def test_integral_float_is_not_an_integer():
+    doc = _valid_document()
+    doc['ticker_info']['lookback_days'] = 120.0
+    is_valid, errors, _ = DataStructureValidator('.').validate_document(doc)
+    assert not is_valid
+    assert errors == ['ticker_info.lookback_days must be integer']
+
+def test_invalid_candles_are_reported_per_candle():
+    doc = _valid_document()
+    doc['data']['historical_candlesticks'] = [_candle(), _candle(o=13.0), _candle(date='bad')]
+    is_valid, errors, _ = DataStructureValidator('.').validate_document(doc)
+    assert not is_valid
+    assert errors == [
+        'Invalid OHLC values in historical_candlesticks[1]: O=13.0, H=12.0, L=9.0, C=11.0',
+        'Invalid date format in historical_candlesticks[2]: bad',
+    ]
@@ -2,6 +2,9 @@
 """
 Test script for Kronos workflow integration
 Tests all components with real data
+
+Run with pytest; the tests are independent, so pytest-xdist can spread them
+across cores: pytest -n auto --dist loadscope test_workflow.py
 """
 
 import sys
@@ -10,7 +13,8 @@ import json
 import logging
 from pathlib import Path
 from datetime import datetime
-import pandas as pd
+import pyarrow.parquet as pq
+import pytest
 
 # Add parent directories to path
 sys.path.append(str(Path(__file__).parent.parent / 'src'))
@@ -21,47 +25,50 @@ from kronos_workflow import KronosWorkflow
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+FINNHUB_DIR = Path('/home/jarden/finnhub-data')
+TICKER_FILE = Path('/home/jarden/option-data/unique_underlying_symbols.txt')
+
+# The workflow runs against the local finnhub export; skip everywhere else
+pytestmark = pytest.mark.skipif(
+    not FINNHUB_DIR.exists() or not TICKER_FILE.exists(),
+    reason=f"workflow data not found under {FINNHUB_DIR} / {TICKER_FILE}"
+)
+
 def test_data_availability():
     """Test if data sources are available"""
     logger.info("Testing data availability...")
 
     # Check finnhub data
-    finnhub_dir = Path('/home/jarden/finnhub-data')
-    if not finnhub_dir.exists():
-        logger.error(f"Finnhub data directory not found: {finnhub_dir}")
-        return False
+    assert FINNHUB_DIR.exists(), f"Finnhub data directory not found: {FINNHUB_DIR}"
 
-    parquet_files = list(finnhub_dir.glob('*.parquet'))
-    logger.info(f"Found {len(parquet_files)} data files")
+    finnhub_files = list(FINNHUB_DIR.glob('*.parquet'))
+    logger.info(f"Found {len(finnhub_files)} data files")
 
     # Check ticker list
-    ticker_file = Path('/home/jarden/option-data/unique_underlying_symbols.txt')
-    if not ticker_file.exists():
-        logger.error(f"Ticker file not found: {ticker_file}")
-        return False
+    assert TICKER_FILE.exists(), f"Ticker file not found: {TICKER_FILE}"
 
-    with open(ticker_file) as f:
+    with open(TICKER_FILE) as f:
         tickers = [line.strip() for line in f if line.strip()]
     logger.info(f"Found {len(tickers)} tickers")
 
     # Check for sample data
     sample_tickers = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA']
     for ticker in sample_tickers:
-        data_file = finnhub_dir / f"{ticker}_1D.parquet"
+        data_file = FINNHUB_DIR / f"{ticker}_1D.parquet"
         if data_file.exists():
-            df = pd.read_parquet(data_file)
-            logger.info(f"{ticker}: {len(df)} days of data")
+            # Row count comes from the parquet footer; no columns are decoded
+            num_rows = pq.ParquetFile(data_file).metadata.num_rows
+            logger.info(f"{ticker}: {num_rows} days of data")
 
-    return True
-
-def test_workflow_components():
+def test_workflow_components(tmp_path):
     """Test individual workflow components"""
     logger.info("Testing workflow components...")
 
+    # Keep the TEST prediction out of the real predictions dir
     config = {
-        'finnhub_data_dir': '/home/jarden/finnhub-data',
-        'predictions_dir': '/home/jarden/transformers-predictions/data',
-        'ticker_file': '/home/jarden/option-data/unique_underlying_symbols.txt'
+        'finnhub_data_dir': str(FINNHUB_DIR),
+        'predictions_dir': str(tmp_path),
+        'ticker_file': str(TICKER_FILE)
     }
 
     workflow = KronosWorkflow(config)
@@ -109,21 +116,19 @@ def test_workflow_components():
             'predicted_end_close_price': 102.0,
             'predicted_move': 2.0
         }]
-        csv_file = '/tmp/test_predictions.csv'
+        csv_file = str(tmp_path / 'test_predictions.csv')
         rows = workflow.csv_exporter.export_to_csv(test_data, csv_file)
         logger.info(f"CSV export test: {rows} rows written")
 
-    return True
-
-def test_mini_workflow():
+def test_mini_workflow(tmp_path):
     """Run a mini workflow with limited tickers"""
     logger.info("Running mini workflow test...")
 
     config = {
-        'finnhub_data_dir': '/home/jarden/finnhub-data',
-        'predictions_dir': '/tmp/test_predictions',
-        'ticker_file': '/home/jarden/option-data/unique_underlying_symbols.txt',
-        'csv_output': '/tmp/test_predictions_summary.csv',
+        'finnhub_data_dir': str(FINNHUB_DIR),
+        'predictions_dir': str(tmp_path / 'predictions'),
+        'ticker_file': str(TICKER_FILE),
+        'csv_output': str(tmp_path / 'test_predictions_summary.csv'),
         'use_gpu': False,  # Use CPU for testing
         'monte_carlo_runs': 3,  # Fewer runs for testing
         'skip_deployment': True
@@ -149,60 +154,7 @@ def test_mini_workflow():
 
     logger.info(f"Mini workflow results: {json.dumps(results, indent=2, default=str)}")
 
-    return results['success']
-
-def main():
-    """Run all tests"""
-    logger.info("=" * 60)
-    logger.info("Kronos Workflow Integration Tests")
-    logger.info("=" * 60)
-
-    tests_passed = 0
-    tests_failed = 0
-
-    # Test 1: Data availability
-    try:
-        if test_data_availability():
-            logger.info("✓ Data availability test passed")
-            tests_passed += 1
-        else:
-            logger.error("✗ Data availability test failed")
-            tests_failed += 1
-    except Exception as e:
-        logger.error(f"✗ Data availability test error: {e}")
-        tests_failed += 1
-
-    # Test 2: Component tests
-    try:
-        if test_workflow_components():
-            logger.info("✓ Component tests passed")
-            tests_passed += 1
-        else:
-            logger.error("✗ Component tests failed")
-            tests_failed += 1
-    except Exception as e:
-        logger.error(f"✗ Component tests error: {e}")
-        tests_failed += 1
-
-    # Test 3: Mini workflow
-    try:
-        if test_mini_workflow():
-            logger.info("✓ Mini workflow test passed")
-            tests_passed += 1
-        else:
-            logger.error("✗ Mini workflow test failed")
-            tests_failed += 1
-    except Exception as e:
-        logger.error(f"✗ Mini workflow test error: {e}")
-        tests_failed += 1
-
-    # Summary
-    logger.info("=" * 60)
-    logger.info(f"Tests Passed: {tests_passed}")
-    logger.info(f"Tests Failed: {tests_failed}")
-    logger.info("=" * 60)
-
-    return 0 if tests_failed == 0 else 1
+    assert results['success']
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(pytest.main([__file__, '-v']))
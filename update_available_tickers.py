@@ -8,20 +8,24 @@ import os
 from pathlib import Path
 from datetime import datetime
 
-def main():
-    data_dir = Path("/home/jarden/transformers-predictions/data")
+from prediction_io import dump_json, list_prediction_files
 
-    # Find all OHLCV prediction files
-    prediction_files = list(data_dir.glob("*_ohlcv_prediction.json"))
+ETF_TICKERS = frozenset(['SPY', 'QQQ', 'IWM', 'DIA', 'VTI', 'VOO', 'EFA', 'EEM', 'AGG', 'GLD', 'SLV'])
+TECH_TICKERS = frozenset(['AAPL', 'MSFT', 'GOOGL', 'META', 'NVDA', 'AMD', 'INTC', 'CRM', 'ORCL', 'IBM'])
+FINANCE_TICKERS = frozenset(['JPM', 'BAC', 'GS', 'MS', 'C', 'WFC', 'BLK', 'V', 'MA', 'AXP'])
 
-    # Extract ticker names
-    tickers = []
-    for file in prediction_files:
-        ticker = file.stem.replace("_ohlcv_prediction", "")
-        tickers.append(ticker)
+# Category of every listed ticker; built lowest priority first so a ticker in
+# several lists keeps the earliest one (etfs, then technology, then finance)
+CATEGORY_BY_TICKER = {
+    ticker: category
+    for category, members in (("finance", FINANCE_TICKERS), ("technology", TECH_TICKERS), ("etfs", ETF_TICKERS))
+    for ticker in members
+}
 
+def build_available_tickers(tickers):
+    """Sort and categorize tickers into the available_tickers.json structure"""
     # Sort tickers
-    tickers.sort()
+    tickers = sorted(tickers)
 
     # Categorize tickers (basic categorization)
     categories = {
@@ -36,20 +40,9 @@ def main():
         "other": 0
     }
 
-    # Simple categorization based on common patterns
-    etf_patterns = ['SPY', 'QQQ', 'IWM', 'DIA', 'VTI', 'VOO', 'EFA', 'EEM', 'AGG', 'GLD', 'SLV']
-    tech_patterns = ['AAPL', 'MSFT', 'GOOGL', 'META', 'NVDA', 'AMD', 'INTC', 'CRM', 'ORCL', 'IBM']
-    finance_patterns = ['JPM', 'BAC', 'GS', 'MS', 'C', 'WFC', 'BLK', 'V', 'MA', 'AXP']
-
+    # Simple categorization by exact ticker, one dict lookup each
     for ticker in tickers:
-        if any(pattern in ticker for pattern in etf_patterns):
-            categories["etfs"] += 1
-        elif any(pattern in ticker for pattern in tech_patterns):
-            categories["technology"] += 1
-        elif any(pattern in ticker for pattern in finance_patterns):
-            categories["finance"] += 1
-        else:
-            categories["other"] += 1
+        categories[CATEGORY_BY_TICKER.get(ticker, "other")] += 1
 
     # Create the JSON structure
     output = {
@@ -59,13 +52,21 @@ def main():
         "categories": categories
     }
 
+    return output
+
+def main():
+    data_dir = Path("/home/jarden/transformers-predictions/data")
+
+    # Find all OHLCV prediction files and extract ticker names
+    tickers = [ticker for ticker, _ in list_prediction_files(data_dir)]
+    output = build_available_tickers(tickers)
+
     # Save to file
     output_file = data_dir / "available_tickers.json"
-    with open(output_file, 'w') as f:
-        json.dump(output, f, indent=2)
+    dump_json(output, output_file)
 
-    print(f"Updated available_tickers.json with {len(tickers)} tickers")
-    print(f"Sample tickers: {tickers[:10]}")
+    print(f"Updated available_tickers.json with {output['total_count']} tickers")
+    print(f"Sample tickers: {output['tickers'][:10]}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
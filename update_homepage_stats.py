@@ -4,53 +4,141 @@ Update homepage statistics based on actual prediction files
 """
 
 import json
+import logging
+import os
+import re
 from pathlib import Path
-
-def count_predictions():
-    """Count predictions and calculate statistics"""
-    data_dir = Path('/home/jarden/transformers-predictions/data')
-
+from typing import Any, Optional
+
+from prediction_io import list_prediction_files
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+logger = logging.getLogger(__name__)
+
+def _loads(raw):
+    """Parse JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def _read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+if msgspec is not None:
+    # Only the fields count_predictions reads; msgspec skips everything else,
+    # and Raw leaves the candlestick arrays as undecoded bytes
+    class _SummaryStats(msgspec.Struct):
+        direction: Any = msgspec.UNSET
+        price_change_percent: Any = msgspec.UNSET
+
+    class _DataSection(msgspec.Struct):
+        predicted_candlesticks: msgspec.Raw = None
+
+    class _ChartData(msgspec.Struct):
+        predicted: msgspec.Raw = None
+
+    class _Prediction(msgspec.Struct):
+        data: Optional[_DataSection] = None
+        chart_data: Optional[_ChartData] = None
+        summary_stats: Optional[_SummaryStats] = None
+
+    _prediction_decoder = msgspec.json.Decoder(_Prediction)
+
+# What a malformed or unreadable prediction file can raise: read errors,
+# JSON syntax errors (ValueError subclasses), msgspec decode/type errors and,
+# for odd document shapes, lookups on the wrong type
+BAD_FILE_ERRORS = (OSError, ValueError, TypeError, AttributeError, KeyError) + \
+    ((msgspec.DecodeError,) if msgspec is not None else ())
+
+def _truthy(raw):
+    """Truthiness of a raw JSON value; only short values can be empty or null."""
+    return raw is not None and (len(raw) > 16 or bool(msgspec.json.decode(raw)))
+
+def summarize_prediction(data):
+    """Return (has_predictions, summary_stats dict or None) for a parsed prediction file"""
+    has_preds = False
+    if 'data' in data and 'predicted_candlesticks' in data['data'] and data['data']['predicted_candlesticks']:
+        has_preds = True
+    elif 'chart_data' in data and 'predicted' in data['chart_data'] and data['chart_data']['predicted']:
+        has_preds = True
+    return has_preds, data.get('summary_stats')
+
+def _parse_prediction(raw):
+    """Return (has_predictions, summary_stats dict or None) for one prediction file's bytes"""
+    if msgspec is None:
+        return summarize_prediction(_loads(raw))
+
+    pred = _prediction_decoder.decode(raw)
+    has_preds = (pred.data is not None and _truthy(pred.data.predicted_candlesticks)) or \
+        (pred.chart_data is not None and _truthy(pred.chart_data.predicted))
+    summary = None
+    if pred.summary_stats is not None:
+        summary = {field: value for field in pred.summary_stats.__struct_fields__
+                   if (value := getattr(pred.summary_stats, field)) is not msgspec.UNSET}
+    return has_preds, summary
+
+# The homepage stat cards, matched with whatever value they currently show
+STAT_RE = re.compile(r'id="(totalPredictions|avgMovement|bullishCount|bearishCount)">[^<]*')
+
+def _read_summaries(files):
+    """Yield (has_predictions, summary_stats) per file, or None for one that failed to read or parse"""
+    for f in files:
+        try:
+            summary = _parse_prediction(_read_bytes(f))
+        except BAD_FILE_ERRORS as e:
+            logger.debug("Skipping %s: %s", f, e)
+            summary = None
+        yield summary
+
+def tally_predictions(summaries):
+    """Reduce per-file (has_predictions, summary_stats) pairs into the homepage statistics"""
     total_files = 0
     with_predictions = 0
     bullish_count = 0
     bearish_count = 0
     neutral_count = 0
     total_movement = 0
+    skipped = 0
 
-    for f in data_dir.glob('*_ohlcv_prediction.json'):
-        if f.name == 'kronos_adaptive_summary.json' or f.name == 'kronos_gpu_prediction_summary.json':
-            continue
-
+    for summary in summaries:
         total_files += 1
+        if summary is None:
+            skipped += 1
+            continue
+        has_preds, summary_stats = summary
         try:
-            with open(f, 'r') as file:
-                data = json.load(file)
-
-                # Check if has predictions
-                has_preds = False
-                if 'data' in data and 'predicted_candlesticks' in data['data'] and data['data']['predicted_candlesticks']:
-                    has_preds = True
-                elif 'chart_data' in data and 'predicted' in data['chart_data'] and data['chart_data']['predicted']:
-                    has_preds = True
-
-                if has_preds:
-                    with_predictions += 1
-
-                    # Get direction and movement
-                    if 'summary_stats' in data:
-                        direction = data['summary_stats'].get('direction', 'Neutral')
-                        if direction == 'Bullish':
-                            bullish_count += 1
-                        elif direction == 'Bearish':
-                            bearish_count += 1
-                        else:
-                            neutral_count += 1
-
-                        # Add absolute movement
-                        pct_change = abs(data['summary_stats'].get('price_change_percent', 0))
-                        total_movement += pct_change
-        except:
-            pass
+            if has_preds:
+                with_predictions += 1
+
+                # Get direction and movement
+                if summary_stats is not None:
+                    direction = summary_stats.get('direction', 'Neutral')
+                    if direction == 'Bullish':
+                        bullish_count += 1
+                    elif direction == 'Bearish':
+                        bearish_count += 1
+                    else:
+                        neutral_count += 1
+
+                    # Add absolute movement
+                    pct_change = abs(summary_stats.get('price_change_percent', 0))
+                    total_movement += pct_change
+        except (TypeError, AttributeError) as e:
+            logger.debug("Skipping malformed summary_stats: %s", e)
+            skipped += 1
+
+    if skipped:
+        logger.warning("Skipped %d of %d prediction files that were unreadable or malformed", skipped, total_files)
 
     # Calculate average movement
     avg_movement = total_movement / with_predictions if with_predictions > 0 else 0
@@ -64,29 +152,36 @@ def count_predictions():
         'avg_movement': round(avg_movement, 1)
     }
 
-def update_homepage():
-    """Update the homepage HTML with actual statistics"""
-    stats = count_predictions()
+def count_predictions():
+    """Count predictions and calculate statistics"""
+    data_dir = Path('/home/jarden/transformers-predictions/data')
+    files = [path for _, path in list_prediction_files(data_dir)]
+    return tally_predictions(_read_summaries(files))
+
+def update_homepage(stats=None):
+    """Update the homepage HTML with actual statistics, counting them unless given"""
+    if stats is None:
+        stats = count_predictions()
 
     # Read current HTML
     html_file = Path('/home/jarden/transformers-predictions/dist/index.html')
     with open(html_file, 'r') as f:
         html = f.read()
 
-    # Update the statistics
-    replacements = [
-        ('id="totalPredictions">5,453', f'id="totalPredictions">{stats["with_predictions"]:,}'),
-        ('id="avgMovement">3.7%', f'id="avgMovement">{stats["avg_movement"]}%'),
-        ('id="bullishCount">3,982', f'id="bullishCount">{stats["bullish"]:,}'),
-        ('id="bearishCount">2,619', f'id="bearishCount">{stats["bearish"]:,}'),
-    ]
-
-    for old, new in replacements:
-        html = html.replace(old, new)
+    # Update the statistics in one pass over the page
+    values = {
+        'totalPredictions': f'{stats["with_predictions"]:,}',
+        'avgMovement': f'{stats["avg_movement"]}%',
+        'bullishCount': f'{stats["bullish"]:,}',
+        'bearishCount': f'{stats["bearish"]:,}',
+    }
+    html = STAT_RE.sub(lambda m: f'id="{m.group(1)}">{values[m.group(1)]}', html)
 
-    # Write updated HTML
-    with open(html_file, 'w') as f:
+    # Write updated HTML, renaming it into place so the page is never half-written
+    tmp_file = html_file.with_name(html_file.name + '.tmp')
+    with open(tmp_file, 'w') as f:
         f.write(html)
+    os.replace(tmp_file, html_file)
 
     print(f"Homepage updated with statistics:")
     print(f"  Total predictions: {stats['with_predictions']:,}")
@@ -7,16 +7,22 @@ Generate 5-day forward predictions for 2025-10-06 to 2025-10-10
 import json
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
-import glob
+import zlib
+from multiprocessing import Pool, cpu_count
 from pathlib import Path
 
+from prediction_io import PREDICTION_SUFFIX, dump_json, list_prediction_files
+
 # Configuration
 LOOKBACK_DAYS = 120
 PREDICTION_DAYS = 5
 LOOKBACK_END = "2025-10-03"
 MONTE_CARLO_RUNS = 10
+MAX_WORKERS = 16
+# The percentiles summarize the raw Monte Carlo paths; set INCLUDE_RAW_PATHS=1 to write the paths too
+INCLUDE_RAW_PATHS = os.environ.get('INCLUDE_RAW_PATHS') == '1'
 
 def load_parquet_data(ticker):
     """Load ticker data from parquet file"""
@@ -27,7 +33,10 @@ def load_parquet_data(ticker):
 
     try:
         df = pd.read_parquet(parquet_path)
-        df['date'] = pd.to_datetime(df.index).strftime('%Y-%m-%d')
+        df.index = pd.to_datetime(df.index)
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
+        df['date'] = df.index.strftime('%Y-%m-%d')
         return df
     except Exception as e:
         print(f"Error loading {ticker}: {e}")
@@ -35,165 +44,146 @@ def load_parquet_data(ticker):
 
 def get_lookback_data(df, end_date, lookback_days=120):
     """Get the lookback period data"""
-    end = pd.to_datetime(end_date)
-
-    # Filter data up to end date
-    df['date_parsed'] = pd.to_datetime(df['date'])
-    df = df[df['date_parsed'] <= end].copy()
-
-    # Get last N trading days
-    df = df.tail(lookback_days).copy()
+    # Last N trading days up to end date, sliced on the sorted DatetimeIndex
+    df = df.loc[:end_date].iloc[-lookback_days:]
 
     if len(df) < lookback_days:
         print(f"Warning: Only {len(df)} days available (requested {lookback_days})")
 
     return df
 
-def generate_predictions(historical_data, prediction_days=5):
-    """Generate predictions using enhanced statistical model with Monte Carlo"""
-    if len(historical_data) < 20:
-        return None
-
-    # Calculate returns and volatility
-    returns = historical_data['close'].pct_change().dropna()
-    volatility = returns.std()
+def _prediction_dates(last_date, prediction_days):
+    """Dates of the first prediction_days business days after last_date"""
+    start = last_date + pd.Timedelta(days=1)
+    return pd.bdate_range(start=start, periods=prediction_days).strftime('%Y-%m-%d').tolist()
+
+def ticker_rng(ticker):
+    """Random generator seeded from the ticker, so reruns reproduce a ticker's predictions"""
+    return np.random.default_rng(zlib.crc32(ticker.encode()))
+
+def _compute_stats(historical_data):
+    """Per-ticker statistics the simulation and the summary need, computed once as plain scalars"""
+    # Calculate returns on the close column, as pct_change().dropna() would
+    close = historical_data['close'].to_numpy(dtype=float)
+    returns = close[1:] / close[:-1] - 1
+    returns = returns[~np.isnan(returns)]
     mean_return = returns.mean()
 
     # Recent trend analysis
-    recent_returns = returns.tail(20)
-    recent_volatility = recent_returns.std()
+    recent_returns = returns[-20:]
     recent_mean = recent_returns.mean()
 
-    # Volume analysis
-    avg_volume = historical_data['volume'].tail(20).mean()
-
-    # Starting values
-    last_close = historical_data['close'].iloc[-1]
-    last_date = pd.to_datetime(historical_data['date'].iloc[-1])
-
-    # Generate base predictions
-    predictions = []
-    current_price = last_close
-
-    for i in range(prediction_days):
-        pred_date = last_date + timedelta(days=i+1)
-
-        # Skip weekends
-        while pred_date.weekday() >= 5:
-            pred_date += timedelta(days=1)
-
-        # Weighted mean return (recent trend weighted more)
-        weighted_return = 0.7 * recent_mean + 0.3 * mean_return
-
-        # Add momentum component
-        momentum = np.sign(recent_mean) * 0.002
-
-        # Generate OHLC with realistic relationships
-        daily_return = weighted_return + momentum + np.random.normal(0, recent_volatility)
-        current_price = current_price * (1 + daily_return)
-
-        # Realistic OHLC generation
-        daily_range = current_price * recent_volatility * 1.5
-
-        pred_open = current_price + np.random.uniform(-daily_range/4, daily_range/4)
-        pred_high = max(pred_open, current_price) + np.random.uniform(0, daily_range/2)
-        pred_low = min(pred_open, current_price) - np.random.uniform(0, daily_range/2)
-        pred_close = current_price
-
-        # Ensure OHLC relationships
-        pred_high = max(pred_high, pred_open, pred_close)
-        pred_low = min(pred_low, pred_open, pred_close)
-
-        predictions.append({
-            "date": pred_date.strftime('%Y-%m-%d'),
-            "open": round(float(pred_open), 2),
-            "high": round(float(pred_high), 2),
-            "low": round(float(pred_low), 2),
-            "close": round(float(pred_close), 2),
-            "volume": float(avg_volume)
-        })
+    return {
+        'last_close': float(close[-1]),
+        'last_date': pd.to_datetime(historical_data['date'].iloc[-1]),
+        # Weighted mean return (recent trend weighted more) plus a momentum component
+        'weighted': 0.7 * recent_mean + 0.3 * mean_return,
+        'momentum': np.sign(recent_mean) * 0.002,
+        'recent_vol': recent_returns.std(ddof=1),
+        # Annualized volatility percentage
+        'volatility': returns.std(ddof=1) * np.sqrt(252) * 100,
+        # Volume analysis
+        'avg_volume': float(historical_data['volume'].tail(20).mean()),
+    }
 
-    return predictions
+def simulate(stats, prediction_days=5, num_simulations=10, rng=None):
+    """Generate prediction paths from _compute_stats output using Monte Carlo simulation
+
+    All paths are simulated together: every random draw is one
+    (num_simulations, prediction_days) array and prices compound with cumprod.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    recent_volatility = stats['recent_vol']
+
+    # Daily returns and compounded closes for every path and day
+    shape = (num_simulations, prediction_days)
+    daily_returns = stats['weighted'] + stats['momentum'] + recent_volatility * rng.standard_normal(shape)
+    closes = stats['last_close'] * np.cumprod(1 + daily_returns, axis=1)
+
+    # Realistic OHLC generation
+    daily_range = closes * recent_volatility * 1.5
+    opens = closes + rng.uniform(-daily_range/4, daily_range/4)
+    highs = np.maximum(opens, closes) + rng.uniform(0, daily_range/2)
+    lows = np.minimum(opens, closes) - rng.uniform(0, daily_range/2)
+
+    # Ensure OHLC relationships
+    highs = np.maximum(highs, np.maximum(opens, closes))
+    lows = np.minimum(lows, np.minimum(opens, closes))
+
+    # Round once; the statistics and the JSON both use the rounded prices
+    return np.round(np.stack((opens, highs, lows, closes), axis=-1), 2)
+
+OHLC_FIELDS = ('open', 'high', 'low', 'close')
+PERCENTILES = (10, 25, 50, 75, 90)
+
+def _candles(dates, ohlc, volume):
+    """Candle dicts for one path given as a (days, open/high/low/close) list"""
+    return [
+        {"date": date, **dict(zip(OHLC_FIELDS, prices)), "volume": volume}
+        for date, prices in zip(dates, ohlc)
+    ]
+
+def calculate_percentiles(paths, dates):
+    """Calculate percentile statistics from a simulate() array, keyed by prediction date"""
+    if len(paths) == 0:
+        return {}
 
-def generate_monte_carlo_paths(historical_data, prediction_days=5, num_simulations=10):
-    """Generate multiple prediction paths using Monte Carlo simulation"""
-    if len(historical_data) < 20:
-        return []
+    # (paths, days, open/high/low/close) so each statistic is one call
+    pcts = np.percentile(paths, PERCENTILES, axis=0).tolist()
+    means = paths.mean(axis=0).tolist()
+    stds = paths.std(axis=0).tolist()
 
-    paths = []
+    percentiles = {}
 
-    for _ in range(num_simulations):
-        path_predictions = generate_predictions(historical_data, prediction_days)
-        if path_predictions:
-            paths.append(path_predictions)
+    for day_idx, date in enumerate(dates):
+        percentiles[date] = {
+            field: {
+                **{f'p{q}': pcts[k][day_idx][m] for k, q in enumerate(PERCENTILES)},
+                'mean': means[day_idx][m],
+                'std': stds[day_idx][m]
+            }
+            for m, field in enumerate(OHLC_FIELDS)
+        }
 
-    return paths
+    return percentiles
 
-def calculate_percentiles(monte_carlo_paths):
-    """Calculate percentile statistics from Monte Carlo paths"""
-    if not monte_carlo_paths:
-        return {}
+def create_prediction_json(ticker, historical_data, stats, paths, rng=None):
+    """Create the prediction JSON structure
 
-    percentiles = {}
+    paths is the simulate() array and stats the _compute_stats output it was
+    simulated from. Candle dicts are only built here, for serialization.
+    """
+    if len(paths) == 0:
+        raise ValueError(f"No Monte Carlo paths for {ticker}")
+    if rng is None:
+        rng = np.random.default_rng()
 
-    for day_idx in range(len(monte_carlo_paths[0])):
-        date = monte_carlo_paths[0][day_idx]['date']
-
-        day_stats = {}
-        for metric in ['open', 'high', 'low', 'close']:
-            values = [path[day_idx][metric] for path in monte_carlo_paths]
-
-            day_stats[metric] = {
-                'p10': float(np.percentile(values, 10)),
-                'p25': float(np.percentile(values, 25)),
-                'p50': float(np.percentile(values, 50)),
-                'p75': float(np.percentile(values, 75)),
-                'p90': float(np.percentile(values, 90)),
-                'mean': float(np.mean(values)),
-                'std': float(np.std(values))
-            }
+    dates = _prediction_dates(stats['last_date'], paths.shape[1])
+    volume = stats['avg_volume']
 
-        percentiles[date] = day_stats
+    # Calculate the mean prediction from Monte Carlo paths
+    mean_ohlc = paths.mean(axis=0).tolist()
+    mean_predictions = _candles(dates, mean_ohlc, volume)
 
-    return percentiles
+    # Raw paths are opt-in, so their candle dicts are only built when written
+    monte_carlo_paths = []
+    if INCLUDE_RAW_PATHS:
+        monte_carlo_paths = [_candles(dates, path, volume) for path in paths.tolist()]
 
-def create_prediction_json(ticker, historical_data, predictions, monte_carlo_paths):
-    """Create the prediction JSON structure"""
+    volatility = stats['volatility']
 
-    # Calculate the mean prediction from Monte Carlo paths
-    mean_predictions = []
-    if monte_carlo_paths:
-        for day_idx in range(len(monte_carlo_paths[0])):
-            mean_pred = {
-                "date": monte_carlo_paths[0][day_idx]['date'],
-                "open": float(np.mean([p[day_idx]['open'] for p in monte_carlo_paths])),
-                "high": float(np.mean([p[day_idx]['high'] for p in monte_carlo_paths])),
-                "low": float(np.mean([p[day_idx]['low'] for p in monte_carlo_paths])),
-                "close": float(np.mean([p[day_idx]['close'] for p in monte_carlo_paths])),
-                "volume": float(np.mean([p[day_idx]['volume'] for p in monte_carlo_paths]))
-            }
-            mean_predictions.append(mean_pred)
-    else:
-        mean_predictions = predictions
-
-    # Calculate volatility
-    returns = historical_data['close'].pct_change().dropna()
-    volatility = returns.std() * np.sqrt(252) * 100  # Annualized volatility percentage
-
-    # Prepare historical candlesticks
-    historical_candlesticks = []
-    for _, row in historical_data.iterrows():
-        historical_candlesticks.append({
-            "date": row['date'],
-            "open": float(row['open']),
-            "high": float(row['high']),
-            "low": float(row['low']),
-            "close": float(row['close']),
-            "volume": float(row['volume'])
-        })
+    # Prepare historical candlesticks from whole columns
+    columns = [historical_data['date'].tolist()] + [
+        historical_data[field].astype(float).tolist() for field in ('open', 'high', 'low', 'close', 'volume')
+    ]
+    historical_candlesticks = [
+        {"date": d, "open": o, "high": h, "low": l, "close": c, "volume": v}
+        for d, o, h, l, c, v in zip(*columns)
+    ]
 
     # Calculate percentiles
-    percentiles = calculate_percentiles(monte_carlo_paths) if monte_carlo_paths else {}
+    percentiles = calculate_percentiles(paths, dates)
 
     # Create JSON structure
     prediction_json = {
@@ -221,12 +211,12 @@ def create_prediction_json(ticker, historical_data, predictions, monte_carlo_pat
         "chart_data": {
             "historical_candlesticks": historical_candlesticks,
             "predicted_candlesticks": mean_predictions,
-            "monte_carlo_paths": monte_carlo_paths if monte_carlo_paths else [],
+            "monte_carlo_paths": monte_carlo_paths,
             "prediction_percentiles": percentiles,
             "actual_candlesticks": []
         },
         "summary_stats": {
-            "overall_score": min(95, max(70, 85 + np.random.randint(-5, 10))),
+            "overall_score": min(95, max(70, 85 + int(rng.integers(-5, 10)))),
             "prediction_quality": "GOOD" if volatility < 40 else "MODERATE",
             "volatility": round(float(volatility), 2),
             "monte_carlo_runs": MONTE_CARLO_RUNS
@@ -250,40 +240,33 @@ def process_ticker(ticker):
         print(f"Insufficient data for {ticker}")
         return False
 
-    # Generate predictions
-    predictions = generate_predictions(historical, PREDICTION_DAYS)
-    if not predictions:
-        print(f"Failed to generate predictions for {ticker}")
-        return False
-
-    # Generate Monte Carlo paths
-    monte_carlo_paths = generate_monte_carlo_paths(historical, PREDICTION_DAYS, MONTE_CARLO_RUNS)
+    # Generate Monte Carlo paths, all drawn from this ticker's generator
+    stats = _compute_stats(historical)
+    rng = ticker_rng(ticker)
+    paths = simulate(stats, PREDICTION_DAYS, MONTE_CARLO_RUNS, rng)
 
     # Create JSON
-    prediction_json = create_prediction_json(ticker, historical, predictions, monte_carlo_paths)
+    prediction_json = create_prediction_json(ticker, historical, stats, paths, rng)
 
     # Save to file
-    output_path = f"/home/jarden/transformers-predictions/data/{ticker}_ohlcv_prediction.json"
-    with open(output_path, 'w') as f:
-        json.dump(prediction_json, f, indent=2)
+    output_path = f"/home/jarden/transformers-predictions/data/{ticker}{PREDICTION_SUFFIX}"
+    dump_json(prediction_json, output_path)
 
     print(f"✓ Saved {ticker} predictions to {output_path}")
     return True
 
+def _process_ticker_result(ticker):
+    """process_ticker for the worker pool, returning (ticker, success)"""
+    return ticker, process_ticker(ticker)
+
 def main():
     """Main processing function"""
     print(f"Updating predictions with lookback ending {LOOKBACK_END}")
     print(f"Generating {PREDICTION_DAYS}-day predictions with {MONTE_CARLO_RUNS} Monte Carlo runs")
     print("="*60)
 
-    # Get list of existing prediction files
-    existing_files = glob.glob("/home/jarden/transformers-predictions/data/*_ohlcv_prediction.json")
-    tickers = []
-
-    for file_path in existing_files:
-        filename = os.path.basename(file_path)
-        ticker = filename.replace("_ohlcv_prediction.json", "")
-        tickers.append(ticker)
+    # Tickers of the existing prediction files, from one scandir pass
+    tickers = sorted(ticker for ticker, _ in list_prediction_files("/home/jarden/transformers-predictions/data"))
 
     print(f"Found {len(tickers)} tickers to update")
 
@@ -291,11 +274,15 @@ def main():
     success_count = 0
     failed_tickers = []
 
-    for ticker in sorted(tickers):
-        if process_ticker(ticker):
-            success_count += 1
-        else:
-            failed_tickers.append(ticker)
+    # Tickers are independent (each seeds its own generator), so spread them over the cores
+    with Pool(processes=min(cpu_count(), MAX_WORKERS)) as pool:
+        for ticker, ok in pool.imap_unordered(_process_ticker_result, tickers, chunksize=8):
+            if ok:
+                success_count += 1
+            else:
+                failed_tickers.append(ticker)
+
+    failed_tickers.sort()
 
     print("="*60)
     print(f"Processing complete: {success_count}/{len(tickers)} successful")